@@ -1,7 +1,9 @@
 from flask import Flask
-from app.extensions import db, jwt, cors
+from app.extensions import db, jwt, cors, events, user_cache, revocations, password_hasher, payment_outbox, gateway_clients, webhook_batcher
 from config import Config
 from app.error_handlers import register_error_handlers
+from app.commands import register_commands
+from app.helper import catalog_cache
 import os
 
 def create_app(config_class=Config):
@@ -12,27 +14,42 @@ def create_app(config_class=Config):
     db.init_app(app)
     jwt.init_app(app)
     cors.init_app(app)
+    events.init_app(app)
+    user_cache.init_app(app)
+    revocations.init_app(app)
+    password_hasher.init_app(app)
+    gateway_clients.init_app(app)
+    payment_outbox.init_app(app)
+    webhook_batcher.init_app(app)
+    catalog_cache.init_app(app)
     
     # Register error handlers
     register_error_handlers(app, jwt)
     
+    # Register CLI commands
+    register_commands(app)
+    
     # Import and register blueprints
     from app.routers.auth import auth_bp
     from app.routers.user import user_bp
     from app.routers.service import service_bp
     from app.routers.vehicle import vehicle_bp
     from app.routers.booking import booking_bp
+    from app.routers.report import report_bp
+    from app.routers.webhook import webhook_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(service_bp)
     app.register_blueprint(vehicle_bp)
     app.register_blueprint(booking_bp)
+    app.register_blueprint(report_bp)
+    app.register_blueprint(webhook_bp)
     
     # Create database tables
     with app.app_context():
         # Import all models
-        from app.models import User, Vehicle, Service, Booking, Payment
+        from app.models import User, Vehicle, Service, Booking, Payment, SlotMap, IdempotencyKey, DailyBookingStat, RevokedToken, CacheVersion, PaymentOutbox
         
         # Create database directory if it doesn't exist
         db_path = os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', ''))
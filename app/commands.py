@@ -0,0 +1,101 @@
+import click
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-slot-maps')
+    def rebuild_slot_maps():
+        """Recompute the availability bitmaps from existing bookings."""
+        from app.helper import availability
+        count = availability.rebuild()
+        click.echo(f"Rebuilt {count} slot maps")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Create the service full-text index if missing and repopulate it."""
+        from app.helper import service_search
+        count = service_search.rebuild()
+        click.echo(f"Indexed {count} services")
+
+    @app.cli.command('add-version-columns')
+    def add_version_columns():
+        """Add booking.version and payment.version to a database created before them."""
+        from app.helper import conditional
+        altered = conditional.add_version_columns()
+        click.echo(f"Added version to {', '.join(altered)}" if altered else "Version columns already present")
+
+    @app.cli.command('backfill-plate-keys')
+    def backfill_plate_keys():
+        """Add and fill vehicle.plate_key, then build its unique index."""
+        from app.helper import numberplate
+        filled, duplicates = numberplate.backfill()
+        click.echo(f"Normalised {filled} numberplates")
+        for vehicle_id, plate in duplicates:
+            click.echo(f"Duplicate plate left unindexed: {plate} (vehicle {vehicle_id})")
+
+    @app.cli.command('drain-payment-outbox')
+    def drain_payment_outbox():
+        """Run every payment initialisation that is due, e.g. after a restart."""
+        from app.extensions import payment_outbox
+        count = payment_outbox.drain()
+        click.echo(f"Processed {count} outbox entries")
+
+    @app.cli.command('replay-webhooks')
+    @click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=500, show_default=True, help='Events applied per commit.')
+    def replay_webhooks(paths, batch_size):
+        """Re-ingest archived webhook deliveries; already-applied events are skipped."""
+        from collections import Counter
+        from app.extensions import webhook_batcher
+        from app.helper import webhooks
+        totals = Counter()
+        for path in paths:
+            batch = []
+            for item in webhooks.read_archive(path):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    totals.update(webhook_batcher.apply(batch))
+                    batch = []
+            if batch:
+                totals.update(webhook_batcher.apply(batch))
+            click.echo(f"Replayed {path}")
+        click.echo(", ".join(f"{count} {result}" for result, count in sorted(totals.items())) or "No events")
+
+    @app.cli.command('reconcile')
+    @click.option('--gateway', required=True, type=click.Choice(['stripe', 'razorpay']))
+    @click.option('--file', 'path', required=True, type=click.Path(exists=True, dir_okay=False),
+                  help='Settlement report CSV from the gateway.')
+    @click.option('--output', default=None, help='Discrepancy CSV (default: <file>.discrepancies.csv).')
+    @click.option('--chunk-size', default=None, type=int, help='Report rows per chunk.')
+    @click.option('--workers', default=None, type=int, help='Processes checking chunks.')
+    def reconcile_payments(gateway, path, output, chunk_size, workers):
+        """Check payments against a settlement report and catch up their statuses."""
+        from app.helper import reconcile
+        output = output or f"{path}.discrepancies.csv"
+        try:
+            totals = reconcile.reconcile(
+                path, gateway, output,
+                chunk_size=chunk_size or app.config['RECONCILE_CHUNK_SIZE'],
+                workers=app.config['RECONCILE_WORKERS'] if workers is None else workers,
+                database_uri=app.config['SQLALCHEMY_DATABASE_URI']
+            )
+        except reconcile.ReconcileError as error:
+            raise click.ClickException(str(error))
+        click.echo(f"Checked {totals['rows']} rows: {totals['discrepancies']} discrepancies "
+                   f"written to {output}, {totals['updated']} payments updated")
+
+    @app.cli.command('migrate-payment-responses')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows rewritten per commit.')
+    def migrate_payment_responses(batch_size):
+        """Convert payment.payment_response from JSON text to JSONB/compressed storage."""
+        from app.helper import compressed_json
+        converted, unreadable = compressed_json.migrate(batch_size)
+        click.echo(f"Converted {converted} payment responses")
+        for payment_id in unreadable:
+            click.echo(f"Left payment {payment_id}: stored response is not valid JSON")
+
+    @app.cli.command('backfill-rollups')
+    def backfill_rollups():
+        """Rebuild daily_booking_stats from the booking table."""
+        from app.helper import rollup
+        count = rollup.backfill()
+        click.echo(f"Rebuilt {count} daily booking stat rows")
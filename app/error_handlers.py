@@ -30,6 +30,13 @@ def register_error_handlers(app, jwt):
             "error": "authorization_required"
         }), 401
 
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return jsonify({
+            "message": "The token has been revoked",
+            "error": "token_revoked"
+        }), 401
+
     @jwt.needs_fresh_token_loader
     def token_not_fresh_callback(jwt_header, jwt_payload):
         return jsonify({
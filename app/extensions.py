@@ -1,7 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from app.helper.event_hub import EventHub
+from app.helper.user_cache import UserCache
+from app.helper.password_pool import PasswordHasher
+from app.helper.payment_outbox import PaymentOutbox
+from app.helper.gateway_client import GatewayClients
+from app.helper.webhook_batcher import WebhookBatcher
+from app.helper.revocation import BloomRevocationStore, DatabaseRevocationStore
 
 db = SQLAlchemy()
 jwt = JWTManager()
-cors = CORS() 
\ No newline at end of file
+cors = CORS() 
+events = EventHub()
+user_cache = UserCache()
+password_hasher = PasswordHasher()
+payment_outbox = PaymentOutbox()
+gateway_clients = GatewayClients()
+webhook_batcher = WebhookBatcher()
+revocations = BloomRevocationStore(DatabaseRevocationStore())
+
+@jwt.token_in_blocklist_loader
+def token_revoked(jwt_header, jwt_payload):
+    return revocations.is_revoked(jwt_payload['jti'])
@@ -1,11 +1,14 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, create_refresh_token
+from app.extensions import password_hasher
 
 def password_hash(password):
-    return generate_password_hash(password, method='pbkdf2:sha256')
+    return password_hasher.hash(password)
 
 def verify_password(password, hashed_password):
-    return check_password_hash(hashed_password, password)
+    return password_hasher.verify(password, hashed_password)
+
+def needs_rehash(hashed_password):
+    return password_hasher.needs_rehash(hashed_password)
 
 def access_token(user):
     return create_access_token(
@@ -0,0 +1,178 @@
+from flask import current_app
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import SlotMap, Booking, Vehicle
+from app.helper.slot_helper import INACTIVE_STATUSES, bay_capacity
+
+# Fixed slot granularity; a day is 96 bits wide
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# A day's occupancy is kept as "layers" of bitmaps: bit s of layer i is set
+# when at least i + 1 bookings hold slot s. Slot s is full for a capacity c
+# exactly when bit s of layer c - 1 is set.
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def slot_index(value):
+    return _minutes(value) // SLOT_MINUTES
+
+
+def slot_mask(time_from, time_to):
+    """Bits for every slot the interval touches (partial slots count)."""
+    start = slot_index(time_from)
+    end = -(-_minutes(time_to) // SLOT_MINUTES)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def add_interval(layers, mask):
+    pending = mask
+    for i, layer in enumerate(layers):
+        if not pending:
+            break
+        layers[i] = layer | pending
+        pending &= layer
+    if pending:
+        layers.append(pending)
+    return layers
+
+
+def remove_interval(layers, mask):
+    pending = mask
+    for i in range(len(layers) - 1, -1, -1):
+        hit = layers[i] & pending
+        layers[i] &= ~hit
+        pending &= ~hit
+    while layers and not layers[-1]:
+        layers.pop()
+    return layers
+
+
+def decode_layers(value):
+    return [int(layer, 16) for layer in value.split(',')] if value else []
+
+
+def encode_layers(layers):
+    return ','.join(format(layer, 'x') for layer in layers)
+
+
+def free_starts(layers, capacity, slots_needed, open_slot, close_slot):
+    """Bitmap of start slots where ``slots_needed`` consecutive slots fit."""
+    last_start = close_slot - slots_needed
+    if last_start < open_slot:
+        return 0
+    full = layers[capacity - 1] if len(layers) >= capacity else 0
+    blocked = 0
+    for offset in range(slots_needed):
+        blocked |= full >> offset
+    window = ((1 << (last_start - open_slot + 1)) - 1) << open_slot
+    return window & ~blocked
+
+
+def _slot_map(booking_date, vehicle_type):
+    slot_map = SlotMap.query.filter_by(
+        vehicle_type=vehicle_type, date=booking_date
+    ).with_for_update().first()
+    if not slot_map:
+        slot_map = SlotMap(vehicle_type=vehicle_type, date=booking_date, layers='')
+        db.session.add(slot_map)
+    return slot_map
+
+
+def reserve(booking_date, vehicle_type, time_from, time_to):
+    slot_map = _slot_map(booking_date, vehicle_type)
+    layers = add_interval(decode_layers(slot_map.layers), slot_mask(time_from, time_to))
+    slot_map.layers = encode_layers(layers)
+
+
+def release(booking_date, vehicle_type, time_from, time_to):
+    slot_map = _slot_map(booking_date, vehicle_type)
+    layers = remove_interval(decode_layers(slot_map.layers), slot_mask(time_from, time_to))
+    slot_map.layers = encode_layers(layers)
+
+
+def status_changed(booking, vehicle_type, old_status):
+    """Keep the day's bitmap in step when a booking enters or leaves an
+    inactive state; call inside the transaction that changes the status."""
+    was_active = old_status not in INACTIVE_STATUSES
+    is_active = booking.status not in INACTIVE_STATUSES
+    if was_active and not is_active:
+        release(booking.date, vehicle_type, booking.time_from, booking.time_to)
+    elif is_active and not was_active:
+        reserve(booking.date, vehicle_type, booking.time_from, booking.time_to)
+
+
+def business_hours():
+    opening = datetime.strptime(current_app.config.get('OPENING_TIME', '00:00'), '%H:%M').time()
+    closing = current_app.config.get('CLOSING_TIME', '24:00')
+    close_slot = SLOTS_PER_DAY if closing == '24:00' else slot_index(datetime.strptime(closing, '%H:%M').time())
+    return slot_index(opening), close_slot
+
+
+def next_available(vehicle_type, duration, start_date, days, limit, now=None):
+    """First ``limit`` free slots from ``start_date`` over ``days`` days.
+
+    One range read of the precomputed bitmaps, then bit operations per day.
+    """
+    now = now or datetime.now()
+    end_date = start_date + timedelta(days=days - 1)
+    maps = {
+        slot_map.date: decode_layers(slot_map.layers)
+        for slot_map in SlotMap.query.filter(
+            SlotMap.vehicle_type == vehicle_type,
+            SlotMap.date >= start_date,
+            SlotMap.date <= end_date
+        )
+    }
+
+    capacity = bay_capacity(vehicle_type)
+    slots_needed = -(-duration // SLOT_MINUTES)
+    open_slot, close_slot = business_hours()
+
+    slots = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        if day < now.date():
+            continue
+        free = free_starts(maps.get(day, []), capacity, slots_needed, open_slot, close_slot)
+        if day == now.date():
+            free &= ~((1 << -(-_minutes(now.time()) // SLOT_MINUTES)) - 1)
+        while free and len(slots) < limit:
+            lowest = free & -free
+            start = datetime.combine(day, datetime.min.time()) + timedelta(
+                minutes=(lowest.bit_length() - 1) * SLOT_MINUTES
+            )
+            slots.append({
+                "date": day.strftime('%Y-%m-%d'),
+                "time_from": start.strftime('%H:%M'),
+                "time_to": (start + timedelta(minutes=duration)).strftime('%H:%M')
+            })
+            free ^= lowest
+        if len(slots) >= limit:
+            break
+    return slots
+
+
+def rebuild():
+    """Recompute every bitmap from the active bookings."""
+    SlotMap.query.delete()
+    maps = {}
+    rows = db.session.query(
+        Booking.date, Booking.time_from, Booking.time_to, Vehicle.vehicle_type
+    ).join(Vehicle, Vehicle.id == Booking.vehicle_id).filter(
+        Booking.status.notin_(INACTIVE_STATUSES)
+    ).yield_per(1000)
+    for row in rows:
+        layers = maps.setdefault((row.vehicle_type, row.date), [])
+        add_interval(layers, slot_mask(row.time_from, row.time_to))
+    db.session.add_all(
+        SlotMap(vehicle_type=vehicle_type, date=day, layers=encode_layers(layers))
+        for (vehicle_type, day), layers in maps.items()
+    )
+    db.session.commit()
+    return len(maps)
@@ -1,5 +1,6 @@
-from app.models import User,Vehicle
+from app.models import User
 from app.helper.auth_helper import verify_password
+from app.helper import numberplate
 
 
 def check_signup(data):
@@ -25,21 +26,22 @@ def check_signup(data):
     return None
 
 def check_login(data):
+    """Returns (user, None) for valid credentials, else (None, error)."""
     required_fields = ["username", "password"]
     
     for field in required_fields:
         if field not in data:
-            return {"message": f"Missing required field: {field}"}, 400
+            return None, ({"message": f"Missing required field: {field}"}, 400)
         if not data[field]:
-            return {"message": f"{field} cannot be empty"}, 400
+            return None, ({"message": f"{field} cannot be empty"}, 400)
     user = User.query.filter_by(username=data["username"]).first()
     if not user:
-        return {"message": "Invalid username"}, 401
+        return None, ({"message": "Invalid username"}, 401)
     
     if not verify_password(data["password"], user.password):
-        return {"message": "Invalid password"}, 401
+        return None, ({"message": "Invalid password"}, 401)
     
-    return None
+    return user, None
 
 def vechile_validation(data):
     required_fields = ["vehicle_name", "vehicle_model", "numberplate", "vehicle_type"]
@@ -47,6 +49,8 @@ def vechile_validation(data):
         if field not in data:
             return {"message": f"Missing required field: {field}"}, 400
         
-    if Vehicle.query.filter_by(numberplate=data["numberplate"]).first():
-                return {"message": "Vehicle with this numberplate already exists"}, 400
+    if not numberplate.normalize(data["numberplate"]):
+        return {"message": "Invalid numberplate"}, 400
+    if numberplate.find(data["numberplate"]):
+        return {"message": "Vehicle with this numberplate already exists"}, 400
     return None
\ No newline at end of file
@@ -0,0 +1,244 @@
+from datetime import datetime
+from app.extensions import db
+from app.models import Booking, Service, Vehicle, User, Payment
+from app.helper.pagination import PaginationError, page_size, encode_cursor, decode_cursor, paginate
+
+# Every column the booking responses read, fetched in one joined SELECT so
+# serializing N bookings never touches the lazy relationships on the models.
+BOOKING_COLUMNS = (
+    Booking.id,
+    Booking.user_id,
+    Booking.date,
+    Booking.time_from,
+    Booking.time_to,
+    Booking.duration,
+    Booking.total_amount,
+    Booking.status,
+    Booking.version,
+    Booking.created_at,
+    Booking.service_id,
+    Service.service_name,
+    Service.price.label('service_price'),
+    Booking.vehicle_id,
+    Vehicle.vehicle_name,
+    Vehicle.numberplate,
+    User.username,
+    Payment.id.label('payment_id'),
+    Payment.payment_status,
+    Payment.payment_method,
+    Payment.amount.label('payment_amount'),
+    Payment.transaction_id,
+    Payment.version.label('payment_version'),
+    Payment.created_at.label('payment_created_at'),
+    Payment.updated_at.label('payment_updated_at'),
+)
+
+BOOKING_ORDER = (Booking.date, Booking.created_at, Booking.id)
+
+
+def booking_query():
+    return db.session.query(*BOOKING_COLUMNS) \
+        .select_from(Booking) \
+        .outerjoin(Service, Service.id == Booking.service_id) \
+        .outerjoin(Vehicle, Vehicle.id == Booking.vehicle_id) \
+        .outerjoin(User, User.id == Booking.user_id) \
+        .outerjoin(Payment, Payment.booking_id == Booking.id)
+
+
+def booking_row(booking_id):
+    return booking_query().filter(Booking.id == booking_id).first()
+
+
+def payment_document(payment_id):
+    """The stored gateway response; deferred on Payment, so only load it for
+    a body that returns it."""
+    return db.session.query(Payment.payment_response).filter(Payment.id == payment_id).scalar()
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise PaginationError(f"{name} must be in YYYY-MM-DD format")
+
+
+def filter_bookings(query, args):
+    """Apply the list filters from the query string inside the database."""
+    if args.get('status'):
+        query = query.filter(Booking.status.in_(args['status'].split(',')))
+    if args.get('date_from'):
+        query = query.filter(Booking.date >= _parse_date(args['date_from'], 'date_from'))
+    if args.get('date_to'):
+        query = query.filter(Booking.date <= _parse_date(args['date_to'], 'date_to'))
+    if args.get('service_id'):
+        query = query.filter(Booking.service_id == args['service_id'])
+    if args.get('vehicle_id'):
+        query = query.filter(Booking.vehicle_id == args['vehicle_id'])
+    return query
+
+
+def booking_cursor(row):
+    return encode_cursor([
+        row.date.isoformat(),
+        row.created_at.isoformat(),
+        row.id
+    ])
+
+
+def parse_booking_cursor(cursor):
+    values = decode_cursor(cursor, len(BOOKING_ORDER))
+    if values is None:
+        return None
+    try:
+        return [
+            datetime.strptime(values[0], '%Y-%m-%d').date(),
+            datetime.fromisoformat(values[1]),
+            str(values[2])
+        ]
+    except (TypeError, ValueError):
+        raise PaginationError("Invalid cursor")
+
+
+def booking_page(query, args):
+    limit = page_size(args)
+    after = parse_booking_cursor(args.get('cursor'))
+    rows, has_more = paginate(filter_bookings(query, args), BOOKING_ORDER, after, limit)
+    next_cursor = booking_cursor(rows[-1]) if has_more else None
+    return rows, next_cursor
+
+
+def _payment_status(row):
+    return row.payment_status if row.payment_id else "no_payment"
+
+
+def user_booking(row):
+    return {
+        "id": row.id,
+        "service": {
+            "id": row.service_id,
+            "name": row.service_name,
+            "price": row.service_price
+        },
+        "vehicle": {
+            "id": row.vehicle_id,
+            "name": row.vehicle_name,
+            "numberplate": row.numberplate
+        },
+        "date": row.date.strftime('%Y-%m-%d'),
+        "time_from": row.time_from.strftime('%H:%M'),
+        "time_to": row.time_to.strftime('%H:%M'),
+        "duration": row.duration,
+        "total_amount": row.total_amount,
+        "status": row.status,
+        "payment_status": _payment_status(row),
+        "created_at": row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def admin_booking(row):
+    return {
+        "id": row.id,
+        "user": {
+            "id": row.user_id,
+            "username": row.username
+        },
+        "service": {
+            "id": row.service_id,
+            "name": row.service_name
+        },
+        "vehicle": {
+            "id": row.vehicle_id,
+            "numberplate": row.numberplate
+        },
+        "date": row.date.strftime('%Y-%m-%d'),
+        "status": row.status,
+        "payment_status": _payment_status(row)
+    }
+
+
+def booking_detail(row):
+    return {
+        "id": row.id,
+        "service": {
+            "id": row.service_id,
+            "name": row.service_name,
+            "price": row.service_price
+        },
+        "vehicle": {
+            "id": row.vehicle_id,
+            "name": row.vehicle_name,
+            "numberplate": row.numberplate
+        },
+        "date": row.date.strftime('%Y-%m-%d'),
+        "time_from": row.time_from.strftime('%H:%M'),
+        "time_to": row.time_to.strftime('%H:%M'),
+        "duration": row.duration,
+        "total_amount": row.total_amount,
+        "status": row.status,
+        "payment": {
+            "status": row.payment_status,
+            "method": row.payment_method,
+            "transaction_id": row.transaction_id
+        } if row.payment_id else None
+    }
+
+
+def status_update(row, old_status, user):
+    return {
+        "id": row.id,
+        "old_status": old_status,
+        "new_status": row.status,
+        "service": {
+            "id": row.service_id,
+            "name": row.service_name
+        },
+        "vehicle": {
+            "id": row.vehicle_id,
+            "numberplate": row.numberplate
+        },
+        "customer": {
+            "id": row.user_id,
+            "username": row.username
+        },
+        "updated_by": {
+            "id": str(user.id),
+            "username": user.username,
+            "role": user.role
+        }
+    }
+
+
+EXPORT_FIELDS = (
+    'id', 'date', 'time_from', 'time_to', 'duration', 'total_amount', 'status', 'created_at',
+    'user_id', 'username',
+    'service_id', 'service_name', 'service_price',
+    'vehicle_id', 'vehicle_name', 'numberplate',
+    'payment_id', 'payment_status', 'payment_method', 'payment_amount', 'transaction_id'
+)
+
+
+def export_row(row):
+    """Flat, JSON/CSV friendly record for one booking row."""
+    record = {}
+    for field in EXPORT_FIELDS:
+        value = getattr(row, field)
+        record[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return record
+
+
+def stream_rows(query, batch_size=1000):
+    """Iterate the query through a server-side cursor in key order."""
+    return query.order_by(*BOOKING_ORDER).execution_options(yield_per=batch_size)
+
+
+def payment_status(row, document):
+    return {
+        "id": row.payment_id,
+        "data": document,
+        "status": row.payment_status,
+        "method": row.payment_method,
+        "amount": row.payment_amount,
+        "transaction_id": row.transaction_id,
+        "created_at": row.payment_created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        "updated_at": row.payment_updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
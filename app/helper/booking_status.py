@@ -0,0 +1,121 @@
+from datetime import datetime
+from sqlalchemy import update, tuple_
+from app.extensions import db
+from app.models import Booking, Payment, Vehicle
+from app.helper import availability
+from app.helper import rollup
+
+# Statuses staff may move a booking to, keyed by the status it is in now
+TRANSITIONS = {
+    'pending': ('confirmed', 'cancelled'),
+    'confirmed': ('startservice', 'complete', 'cancelled'),
+    'startservice': ('complete', 'cancelled'),
+    'complete': (),
+    'cancelled': (),
+}
+
+VALID_STATUSES = ['confirmed', 'startservice', 'complete', 'cancelled']
+
+MAX_BATCH_SIZE = 500
+
+
+def _result(booking_id, result, **extra):
+    return {"booking_id": booking_id, "result": result, **extra}
+
+
+def apply_status_changes(items, role):
+    """Validate and apply ``{booking_id, status[, version]}`` items in the
+    caller's transaction.
+
+    Current rows are read (and locked where supported) in one query, then
+    each target status is written with a single set-based UPDATE that only
+    matches the (id, version) pairs that were read, so a concurrent writer
+    turns the item into a version_conflict instead of being overwritten.
+    Returns one result per item, in order; the caller commits.
+    """
+    booking_ids = [
+        item['booking_id'] for item in items
+        if isinstance(item, dict) and isinstance(item.get('booking_id'), str)
+    ]
+    current = {
+        row.id: row for row in db.session.query(
+            Booking.id, Booking.status, Booking.version, Booking.date, Booking.time_from,
+            Booking.time_to, Booking.service_id, Booking.total_amount,
+            Booking.duration, Vehicle.vehicle_type
+        ).join(Vehicle, Vehicle.id == Booking.vehicle_id)
+        .filter(Booking.id.in_(booking_ids))
+        .with_for_update(of=Booking)
+    }
+
+    results = []
+    targets = {}
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict) or not item.get('booking_id') or 'status' not in item \
+                or not isinstance(item.get('booking_id'), str):
+            results.append(_result(None, "invalid_item", message="booking_id and status are required"))
+            continue
+        booking_id, status = item['booking_id'], item['status']
+        row = current.get(booking_id)
+        if booking_id in seen:
+            results.append(_result(booking_id, "duplicate", message="Booking appears more than once"))
+        elif not row:
+            results.append(_result(booking_id, "not_found", message="Booking not found"))
+        elif status not in VALID_STATUSES:
+            results.append(_result(booking_id, "invalid_status", message="Invalid status",
+                                   valid_statuses=VALID_STATUSES))
+        elif item.get('version') is not None and item['version'] != row.version:
+            results.append(_result(booking_id, "version_conflict",
+                                   message="Booking was modified by another request"))
+        elif status == 'cancelled' and role != 'admin':
+            results.append(_result(booking_id, "forbidden", message="Only admin can cancel bookings"))
+        elif status not in TRANSITIONS.get(row.status, ()):
+            results.append(_result(booking_id, "invalid_transition",
+                                   message=f"Cannot change booking from {row.status} to {status}",
+                                   old_status=row.status))
+        else:
+            targets.setdefault(status, []).append(row)
+            results.append(_result(booking_id, "updated", old_status=row.status, new_status=status))
+        seen.add(booking_id)
+
+    now = datetime.utcnow()
+    by_id = {result['booking_id']: result for result in results if result['result'] == 'updated'}
+    for status, rows in targets.items():
+        updated = db.session.execute(
+            update(Booking)
+            .where(tuple_(Booking.id, Booking.version).in_([(row.id, row.version) for row in rows]))
+            .values(status=status, version=Booking.version + 1, updated_at=now),
+            execution_options={"synchronize_session": False}
+        )
+        if updated.rowcount != len(rows):
+            # Someone else wrote between our read and the UPDATE
+            applied = {
+                booking_id for (booking_id,) in db.session.query(Booking.id).filter(
+                    tuple_(Booking.id, Booking.version).in_([(row.id, row.version + 1) for row in rows]),
+                    Booking.status == status
+                )
+            }
+            for row in rows:
+                if row.id not in applied:
+                    result = by_id[row.id]
+                    result.pop('new_status')
+                    result.update(result="version_conflict",
+                                  message="Booking was modified by another request")
+            rows = [row for row in rows if row.id in applied]
+            if not rows:
+                continue
+
+        ids = [row.id for row in rows]
+        if status == 'complete':
+            db.session.execute(
+                update(Payment)
+                .where(Payment.booking_id.in_(ids))
+                .values(payment_status='completed', version=Payment.version + 1, updated_at=now),
+                execution_options={"synchronize_session": False}
+            )
+        if status == 'cancelled':
+            for row in rows:
+                availability.release(row.date, row.vehicle_type, row.time_from, row.time_to)
+        rollup.status_changes((row, row.status, status) for row in rows)
+
+    return results
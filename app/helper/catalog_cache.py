@@ -0,0 +1,83 @@
+from flask import current_app
+from sqlalchemy import event, update, insert
+from app.extensions import db
+from app.models import CacheVersion, Service
+from app.response import success_response
+import hashlib
+import json
+import threading
+import time
+
+# The public service catalog is read far more often than it changes, so
+# each worker keeps the encoded GET /services body. Writers bump the
+# 'catalog' row in cache_version; workers compare it at most every
+# CATALOG_CHECK_SECONDS and serve the cached bytes in between.
+
+CATALOG = 'catalog'
+
+
+class CatalogCache:
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entry = None
+        self._next_check = 0
+
+    def get(self):
+        """(body bytes, etag) of the current catalog."""
+        entry = self._entry
+        now = time.monotonic()
+        if entry and now < self._next_check:
+            return entry[1:]
+        with self._lock:
+            version = _stored_version()
+            if not self._entry or self._entry[0] != version:
+                self._entry = _build(version)
+            self._next_check = now + self.check_interval
+            return self._entry[1:]
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+            self._next_check = 0
+
+
+def init_app(app):
+    app.extensions['catalog_cache'] = CatalogCache(app.config.get('CATALOG_CHECK_SECONDS', 5))
+
+
+def _stored_version():
+    return db.session.query(CacheVersion.version).filter(CacheVersion.name == CATALOG).scalar() or 0
+
+
+def _build(version):
+    services = Service.query.order_by(Service.service_name, Service.id).all()
+    services_data = [success_response.service_to_dict(service) for service in services]
+    body = json.dumps({
+        "message": "Services retrieved successfully",
+        "services": services_data,
+        "total": len(services_data)
+    }).encode('utf-8') + b"\n"
+    return version, body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def get():
+    return current_app.extensions['catalog_cache'].get()
+
+
+def invalidate():
+    """Bump the catalog version in the caller's transaction and drop this
+    worker's copy once it commits; call before committing a service write.
+
+    Clearing only after the commit matters: a read on this worker before
+    then would otherwise cache the old catalog again.
+    """
+    result = db.session.execute(
+        update(CacheVersion).where(CacheVersion.name == CATALOG)
+        .values(version=CacheVersion.version + 1),
+        execution_options={"synchronize_session": False}
+    )
+    if not result.rowcount:
+        db.session.execute(insert(CacheVersion).values(name=CATALOG, version=1))
+    cache = current_app.extensions['catalog_cache']
+    event.listen(db.session(), 'after_commit', lambda session: cache.clear(), once=True)
@@ -0,0 +1,91 @@
+from sqlalchemy import LargeBinary, bindparam, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
+import json
+import zlib
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON document column: native JSONB on PostgreSQL, zlib-compressed
+    JSON bytes elsewhere.
+
+    Values still stored as JSON text (rows written before the column was
+    converted) decode too, so the migration can run while the app serves.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, (bytes, memoryview)):
+            return json.loads(zlib.decompress(value).decode('utf-8'))
+        try:
+            return json.loads(value)
+        except ValueError:
+            # Unmigrated text that was never JSON; hand it back as stored
+            return value
+
+
+def migrate(batch_size=1000):
+    """Convert payment.payment_response from JSON text in place.
+
+    PostgreSQL changes the column type to JSONB in one ALTER. SQLite keeps
+    the declared column (it stores BLOBs whatever the affinity) and rewrites
+    text rows in batches of ``batch_size``, committing each. Returns
+    ``(converted, unreadable)``: the number of rows rewritten and the ids of
+    rows whose text isn't valid JSON, which are left untouched.
+    """
+    from app.extensions import db
+    from app.models import Payment
+    if db.engine.dialect.name == 'postgresql':
+        column_type = db.session.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'payment' AND column_name = 'payment_response'"
+        )).scalar()
+        if column_type == 'jsonb':
+            return 0, []
+        converted = db.session.execute(text(
+            "SELECT count(*) FROM payment WHERE payment_response IS NOT NULL"
+        )).scalar()
+        db.session.execute(text(
+            "ALTER TABLE payment ALTER COLUMN payment_response TYPE JSONB "
+            "USING payment_response::jsonb"
+        ))
+        db.session.commit()
+        return converted, []
+
+    payments = Payment.__table__
+    statement = update(payments).where(payments.c.id == bindparam('target_id')) \
+        .values(payment_response=bindparam('document', type_=CompressedJSON()))
+    converted, unreadable, last_id = 0, [], ''
+    while True:
+        rows = db.session.execute(text(
+            "SELECT id, payment_response FROM payment "
+            "WHERE typeof(payment_response) = 'text' AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            break
+        documents = []
+        for payment_id, raw in rows:
+            try:
+                documents.append({"target_id": payment_id, "document": json.loads(raw)})
+            except ValueError:
+                unreadable.append(payment_id)
+        if documents:
+            db.session.execute(statement, documents)
+        db.session.commit()
+        converted += len(documents)
+        last_id = rows[-1][0]
+    return converted, unreadable
@@ -0,0 +1,63 @@
+from flask import request, Response
+from sqlalchemy import inspect, text
+from werkzeug.http import quote_etag
+from app.extensions import db
+
+# Tables whose rows carry the version behind their ETags
+VERSIONED_TABLES = ('booking', 'payment')
+
+
+class PreconditionFailed(ValueError):
+    pass
+
+
+def booking_etag(row):
+    """Booking representations change with the booking or its payment."""
+    return f"{row.version}.{row.payment_version or 0}"
+
+
+def payment_etag(row):
+    return str(row.payment_version)
+
+
+def etag_headers(tag):
+    return {'ETag': quote_etag(tag)}
+
+
+def not_modified(tag):
+    return request.if_none_match.contains_weak(tag)
+
+
+def not_modified_response(tag):
+    return Response(status=304, headers=etag_headers(tag))
+
+
+def expected_version():
+    """Version a conditional write must still find, from If-Match.
+
+    None when the request is unconditional (no header or ``*``).
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    tags = list(request.if_match)
+    try:
+        return int(tags[0].split('.')[0])
+    except (IndexError, ValueError):
+        raise PreconditionFailed("If-Match does not match the current version")
+
+
+def add_version_columns():
+    """Add the version column to booking and payment tables created before
+    it existed; every existing row starts at version 1.
+
+    Returns the tables that were altered.
+    """
+    altered = []
+    inspector = inspect(db.engine)
+    for table in VERSIONED_TABLES:
+        if 'version' in {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        with db.engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        altered.append(table)
+    return altered
@@ -0,0 +1,62 @@
+from collections import deque
+import threading
+import uuid
+
+
+class EventHub:
+    """In-process pub/sub for booking change events.
+
+    Keeps the last ``buffer_size`` events so a reconnecting stream can resume
+    from its Last-Event-ID. Ids are ``<hub>-<sequence>``; an id minted by
+    another process (or one older than the buffer) can't be resumed and the
+    subscriber is told to resync instead.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=buffer_size)
+        self._sequence = 0
+        self.hub_id = uuid.uuid4().hex[:8]
+
+    def init_app(self, app):
+        with self._condition:
+            self._events = deque(self._events, maxlen=app.config.get('EVENT_BUFFER_SIZE', 1000))
+        app.extensions['event_hub'] = self
+
+    def publish(self, event_type, data):
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, event_type, data))
+            self._condition.notify_all()
+        return self.event_id(self._sequence)
+
+    def event_id(self, sequence):
+        return f"{self.hub_id}-{sequence}"
+
+    def position(self, last_event_id):
+        """Translate a Last-Event-ID into (sequence, resumable)."""
+        with self._condition:
+            latest = self._sequence
+            oldest = self._events[0][0] if self._events else latest + 1
+        if not last_event_id:
+            return latest, True
+        hub_id, _, sequence = last_event_id.partition('-')
+        if hub_id != self.hub_id or not sequence.isdigit() or int(sequence) > latest:
+            return latest, False
+        sequence = int(sequence)
+        return sequence, sequence >= oldest - 1
+
+    def _after(self, sequence):
+        events = []
+        for event in reversed(self._events):
+            if event[0] <= sequence:
+                break
+            events.append(event)
+        events.reverse()
+        return events
+
+    def wait(self, sequence, timeout):
+        """Events newer than ``sequence``; blocks up to ``timeout`` seconds."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > sequence, timeout)
+            return self._after(sequence)
@@ -0,0 +1,5 @@
+def prefix_filter(column, prefix):
+    """``column LIKE 'prefix%'`` as a half-open range, so a plain B-tree
+    index serves it regardless of collation or LIKE settings."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (column >= prefix) & (column < upper)
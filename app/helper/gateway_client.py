@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from requests.adapters import HTTPAdapter
+import os
+import requests
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    """The gateway failed too often recently; calls are refused until it cools down."""
+
+
+class GatewayTimeout(Exception):
+    """The gateway call did not finish within the client's timeout."""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and refuses
+    calls for ``reset_timeout`` seconds, then lets one trial call through
+    (half-open) and closes again if it succeeds."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial):
+                raise CircuitOpen("Payment gateway is unavailable, retry later")
+            if state == 'half-open':
+                self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class GatewayClient:
+    """One gateway's pooled keep-alive session, per-call timeouts and breaker.
+
+    ``post`` bounds each request with socket timeouts; ``call_with_deadline``
+    bounds SDK code whose sockets we don't control by running it on the
+    client's executor.
+    """
+
+    def __init__(self, name, base_url=None, timeout=10, connect_timeout=3, pool_size=10, breaker=None):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f'{name}-gateway')
+
+    def timeouts(self):
+        """(connect, read) timeouts for one call."""
+        return (min(self.connect_timeout, self.timeout), self.timeout)
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn`` under the breaker; exceptions and 5xx count as failures."""
+        self.breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def call_with_deadline(self, fn, *args, **kwargs):
+        """``call``, giving up on ``fn`` after ``timeout`` seconds.
+
+        The caller gets GatewayTimeout (a breaker failure) while ``fn`` may
+        still finish on its executor thread; its result is discarded.
+        """
+        def bounded():
+            future = self.executor.submit(fn, *args, **kwargs)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                future.cancel()
+                raise GatewayTimeout(f"{self.name} did not answer within {self.timeout}s")
+        return self.call(bounded)
+
+    def post(self, path, payload):
+        def send():
+            response = self.session.post(self.base_url.rstrip('/') + path, json=payload,
+                                         timeout=self.timeouts())
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response
+        return self.call(send)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class GatewayClients:
+    """The per-worker set of gateway clients.
+
+    Sessions are built at startup and rebuilt in a child process after a
+    fork, so pre-forking servers never share sockets between workers. The
+    stripe and razorpay SDKs are pointed at the pooled sessions.
+    """
+
+    GATEWAYS = ('stripe', 'razorpay', 'paypal')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = None
+        self.config = {}
+
+    def init_app(self, app):
+        self.config = {
+            'base_url': app.config.get('PAYMENT_GATEWAY_URL'),
+            'timeouts': app.config.get('PAYMENT_GATEWAY_TIMEOUTS', {}),
+            'connect_timeout': app.config.get('PAYMENT_GATEWAY_CONNECT_TIMEOUT', 3),
+            'pool_size': app.config.get('PAYMENT_GATEWAY_POOL_SIZE', 10),
+            'failure_threshold': app.config.get('PAYMENT_GATEWAY_FAILURE_THRESHOLD', 5),
+            'reset_timeout': app.config.get('PAYMENT_GATEWAY_RESET_SECONDS', 30),
+            'razorpay_auth': (app.config.get('RAZORPAY_KEY_ID'), app.config.get('RAZORPAY_KEY_SECRET')),
+        }
+        self._build()
+        app.extensions['gateway_clients'] = self
+
+    def _build(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            config = self.config
+            self._clients = {
+                name: GatewayClient(
+                    name,
+                    base_url=config['base_url'] and f"{config['base_url'].rstrip('/')}/{name}",
+                    timeout=config['timeouts'].get(name, 10),
+                    connect_timeout=config['connect_timeout'],
+                    pool_size=config['pool_size'],
+                    breaker=CircuitBreaker(config['failure_threshold'], config['reset_timeout'])
+                )
+                for name in self.GATEWAYS
+            }
+            self._pid = os.getpid()
+            self._wire_sdks()
+
+    def _wire_sdks(self):
+        import stripe
+        import razorpay
+        stripe_client = self._clients['stripe']
+        stripe.default_http_client = stripe.http_client.RequestsClient(
+            timeout=stripe_client.timeout, session=stripe_client.session
+        )
+        self.razorpay = razorpay.Client(session=self._clients['razorpay'].session,
+                                        auth=self.config['razorpay_auth'])
+
+    def get(self, name):
+        if self._pid != os.getpid():
+            self._build()
+        return self._clients[name]
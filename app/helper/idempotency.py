@@ -0,0 +1,45 @@
+from flask import current_app
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import IdempotencyKey
+import hashlib
+import json
+
+
+class IdempotencyError(ValueError):
+    pass
+
+
+def fingerprint(data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def lookup(user_id, key, request_hash):
+    """Return the stored (body, status, headers) for a replayed key, if any."""
+    stored = IdempotencyKey.query.filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at > datetime.utcnow()
+    ).first()
+    if not stored:
+        return None
+    if stored.request_hash != request_hash:
+        raise IdempotencyError("Idempotency-Key was already used with a different request")
+    return json.loads(stored.response_body), stored.status_code, {'Idempotent-Replayed': 'true'}
+
+
+def remember(user_id, key, request_hash, body, status_code):
+    """Store a response in the caller's transaction, evicting expired keys."""
+    now = datetime.utcnow()
+    IdempotencyKey.query.filter(IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+    ttl = current_app.config.get('IDEMPOTENCY_TTL', timedelta(hours=24))
+    db.session.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=json.dumps(body),
+        created_at=now,
+        expires_at=now + ttl
+    ))
@@ -0,0 +1,18 @@
+import json
+
+
+def stream_object(envelope, key, items, trailer=None):
+    """Yield ``{**envelope, key: [*items], **trailer(count)}`` as JSON text,
+    one item at a time, so large lists never sit in memory at once.
+
+    ``trailer`` runs after the items are exhausted and returns the fields
+    that depend on them, such as totals or cursors.
+    """
+    head = json.dumps(envelope)[:-1]
+    yield head + (', ' if envelope else '') + json.dumps(key) + ': ['
+    count = 0
+    for item in items:
+        yield (', ' if count else '') + json.dumps(item)
+        count += 1
+    tail = trailer(count) if trailer else {}
+    yield ']' + ''.join(f', {json.dumps(name)}: {json.dumps(value)}' for name, value in tail.items()) + '}\n'
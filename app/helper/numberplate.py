@@ -0,0 +1,54 @@
+from sqlalchemy import inspect, text
+from app.extensions import db
+import re
+
+
+def normalize(plate):
+    """Canonical lookup key for a plate: "KA 01 AB-1234" -> "KA01AB1234"."""
+    return re.sub(r'[^0-9A-Z]', '', (plate or '').upper())
+
+
+def find(plate):
+    from app.models import Vehicle
+    key = normalize(plate)
+    if not key:
+        return None
+    return Vehicle.query.filter(Vehicle.plate_key == key).first()
+
+
+def backfill(batch_size=1000):
+    """Add vehicle.plate_key to a database created before it existed, fill it
+    and build the unique index.
+
+    Returns (filled, duplicates): plates that normalise to a key another
+    vehicle already holds are left NULL and listed for staff to merge.
+    """
+    from app.models import Vehicle
+    columns = {column['name'] for column in inspect(db.engine).get_columns('vehicle')}
+    if 'plate_key' not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE vehicle ADD COLUMN plate_key VARCHAR(50)"))
+
+    taken = {key for (key,) in db.session.query(Vehicle.plate_key).filter(Vehicle.plate_key.isnot(None))}
+    filled, duplicates, last_id = 0, [], ''
+    while True:
+        rows = db.session.query(Vehicle.id, Vehicle.numberplate) \
+            .filter(Vehicle.plate_key.is_(None), Vehicle.id > last_id) \
+            .order_by(Vehicle.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for vehicle_id, numberplate in rows:
+            key = normalize(numberplate)
+            if key in taken:
+                duplicates.append((vehicle_id, numberplate))
+                continue
+            taken.add(key)
+            db.session.query(Vehicle).filter(Vehicle.id == vehicle_id) \
+                .update({"plate_key": key}, synchronize_session=False)
+            filled += 1
+        db.session.commit()
+
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_vehicle_plate_key ON vehicle (plate_key)"))
+    return filled, duplicates
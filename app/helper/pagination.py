@@ -0,0 +1,64 @@
+import base64
+import json
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def page_size(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    raw = args.get('limit')
+    if raw in (None, ''):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be greater than 0")
+    return min(limit, maximum)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode an opaque cursor back into its list of ``size`` key values."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def keyset_after(columns, values):
+    """Row-value comparison ``(c1, c2, ...) > (v1, v2, ...)`` spelled out so
+    every backend can drive it from a composite index on ``columns``."""
+    clauses = []
+    for position, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(position)]
+        clauses.append(and_(*equal, column > values[position]))
+    return or_(*clauses)
+
+
+def paginate(query, columns, after, limit):
+    """Fetch one page ordered by ``columns``.
+
+    Returns the rows and whether another page follows; one extra row is read
+    instead of running a separate COUNT.
+    """
+    if after is not None:
+        query = query.filter(keyset_after(columns, after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
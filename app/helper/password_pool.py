@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+
+
+class HasherBusy(Exception):
+    """Raised instead of queueing when too many hashes are already pending."""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password, hashed_password):
+    return check_password_hash(hashed_password, password)
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded process pool.
+
+    Hashing is deliberately slow, so it is kept off the request threads. At
+    most ``workers + queue_limit`` jobs may be pending; beyond that callers
+    get HasherBusy at once rather than piling up behind a login burst.
+    ``workers = 0`` hashes inline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self.method = 'pbkdf2:sha256:600000'
+        self.workers = 0
+        self.timeout = 30
+        self._prefix = None
+
+    def init_app(self, app):
+        self.shutdown()
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        queue_limit = app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 4 * self.workers)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self._slots = threading.BoundedSemaphore(self.workers + queue_limit) if self.workers else None
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Too many password checks in progress")
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                executor = self._executor
+            return executor.submit(fn, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password, hashed_password):
+        return self._run(_verify, password, hashed_password)
+
+    def _hash_prefix(self):
+        # Werkzeug fills in defaults ('scrypt' is stored as 'scrypt:32768:8:1'),
+        # so compare against what a fresh hash actually records
+        if self._prefix is None or self._prefix[0] != self.method:
+            self._prefix = (self.method, _hash('', self.method).split('$', 1)[0])
+        return self._prefix[1]
+
+    def needs_rehash(self, hashed_password):
+        """True when the stored hash was made with other parameters."""
+        return hashed_password.split('$', 1)[0] != self._hash_prefix()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,178 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update
+import threading
+
+
+class PaymentOutbox:
+    """Runs payment gateway initialisation off the request path.
+
+    BookingList.post writes a payment_outbox row in the booking's
+    transaction and calls ``notify`` after committing. A thread pool then
+    claims the row, calls the gateway and stores its response on the
+    payment, retrying with exponential backoff; a payment that still fails
+    after ``max_attempts`` cancels its booking and frees the bay. Claims are leases (the row's
+    next_attempt_at is pushed out while it runs), so a row held by a crashed
+    worker is picked up again by the sweep that retries due entries. The
+    pool and sweep start with the first booking a process takes; 'flask
+    drain-payment-outbox' catches up after a restart. ``workers = 0`` runs
+    each entry inline after commit and leaves retries to ``drain``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._poller = None
+        self._stop = threading.Event()
+        self.app = None
+        self.gateway = None
+
+    def init_app(self, app):
+        from app.helper.payment_helper import initialize_payment, StubGateway
+        self.shutdown()
+        self.app = app
+        self.workers = app.config.get('PAYMENT_OUTBOX_WORKERS', 4)
+        self.max_attempts = app.config.get('PAYMENT_OUTBOX_MAX_ATTEMPTS', 5)
+        self.backoff = app.config.get('PAYMENT_OUTBOX_BACKOFF_SECONDS', 2)
+        self.max_backoff = app.config.get('PAYMENT_OUTBOX_MAX_BACKOFF_SECONDS', 300)
+        self.lease = app.config.get('PAYMENT_OUTBOX_LEASE_SECONDS', 60)
+        self.poll_interval = app.config.get('PAYMENT_OUTBOX_POLL_SECONDS', 5)
+        self.gateway = StubGateway() if app.config.get('PAYMENT_GATEWAY') == 'stub' else initialize_payment
+        app.extensions['payment_outbox'] = self
+
+    def enqueue(self, payment):
+        """Add the outbox row for ``payment`` to the caller's transaction."""
+        from app.extensions import db
+        from app.models import PaymentOutbox as Entry
+        db.session.add(Entry(payment_id=payment.id, next_attempt_at=datetime.utcnow()))
+
+    def notify(self, payment_id):
+        """Start work on a just-committed entry."""
+        if not self.workers:
+            # The booking is committed; a failed attempt stays due for drain
+            self._process_logged(payment_id)
+            return
+        self._start()
+        self._executor.submit(self._run, payment_id)
+
+    def due(self, limit=500):
+        from app.extensions import db
+        from app.models import PaymentOutbox as Entry
+        return [payment_id for (payment_id,) in db.session.query(Entry.payment_id).filter(
+            Entry.status == 'pending', Entry.next_attempt_at <= datetime.utcnow()
+        ).order_by(Entry.next_attempt_at).limit(limit)]
+
+    def drain(self):
+        """Process every entry that is due now, inline; returns how many were tried."""
+        due = self.due()
+        for payment_id in due:
+            self.process(payment_id)
+        return len(due)
+
+    def process(self, payment_id):
+        """Claim the entry for one attempt and apply the gateway's answer."""
+        from app.extensions import db, events
+        from app.models import PaymentOutbox as Entry, Payment
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(Entry)
+            .where(Entry.payment_id == payment_id, Entry.status == 'pending', Entry.next_attempt_at <= now)
+            .values(attempts=Entry.attempts + 1, next_attempt_at=now + timedelta(seconds=self.lease)),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        cancelled = None
+        entry = Entry.query.filter_by(payment_id=payment_id).first()
+        payment = db.session.get(Payment, payment_id)
+        try:
+            result = self.gateway(payment.payment_method, payment.amount)
+            error = None if result.get('success') else result.get('error') or 'Payment initialization failed'
+        except Exception as exc:
+            result, error = None, str(exc)
+
+        if error is None:
+            entry.status = 'done'
+            payment.payment_status = 'done'
+            payment.payment_response = result
+        elif entry.attempts >= self.max_attempts:
+            entry.status = 'failed'
+            payment.payment_status = 'failed'
+            cancelled = self._cancel_booking(payment.booking)
+        else:
+            delay = min(self.backoff * 2 ** (entry.attempts - 1), self.max_backoff)
+            entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        entry.last_error = error
+        if entry.status != 'pending':
+            payment.version = Payment.version + 1
+        db.session.commit()
+
+        if entry.status != 'pending':
+            events.publish('payment.initialized', {
+                "booking_id": payment.booking_id,
+                "payment_id": payment.id,
+                "payment_status": payment.payment_status
+            })
+        if cancelled:
+            events.publish('booking.status_changed', {
+                "id": payment.booking_id,
+                "old_status": cancelled,
+                "new_status": 'cancelled'
+            })
+
+    @staticmethod
+    def _cancel_booking(booking):
+        """Cancel a booking whose payment could never be initialised, freeing
+        its bay; returns the status it had, or None if it was left alone."""
+        from app.models import Booking
+        from app.helper import availability, rollup
+        from app.helper.booking_status import TRANSITIONS
+        old_status = booking.status
+        if 'cancelled' not in TRANSITIONS.get(old_status, ()):
+            return None
+        booking.status = 'cancelled'
+        booking.version = Booking.version + 1
+        availability.status_changed(booking, booking.vehicle.vehicle_type, old_status)
+        rollup.status_changes([(booking, old_status, 'cancelled')])
+        return old_status
+
+    def _process_logged(self, payment_id):
+        from app.extensions import db
+        try:
+            self.process(payment_id)
+        except Exception:
+            db.session.rollback()
+            self.app.logger.exception("Payment outbox entry %s failed", payment_id)
+
+    def _run(self, payment_id):
+        with self.app.app_context():
+            self._process_logged(payment_id)
+
+    def _poll(self):
+        from app.extensions import db
+        while not self._stop.wait(self.poll_interval):
+            with self.app.app_context():
+                try:
+                    for payment_id in self.due():
+                        self._executor.submit(self._run, payment_id)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception("Payment outbox sweep failed")
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                self._stop.clear()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='payment-outbox')
+                self._poller = threading.Thread(target=self._poll, name='payment-outbox-sweep', daemon=True)
+                self._poller.start()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._stop.set()
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+import math
+import threading
+import time
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counter: ``limit`` hits per ``window`` seconds per key.
+
+    Each key keeps only the counts of the current and previous fixed window;
+    the previous one is weighted by how much of it still overlaps the sliding
+    window. Checks are O(1) and the least recently seen key is evicted once
+    ``max_keys`` are tracked.
+    """
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def hit(self, key, now=None):
+        """Record a hit; returns 0 if allowed, else seconds until retrying."""
+        now = time.time() if now is None else now
+        current = int(now // self.window)
+        elapsed = now - current * self.window
+        with self._lock:
+            window, count, previous = self._keys.pop(key, (current, 0, 0))
+            if window != current:
+                previous = count if window == current - 1 else 0
+                count = 0
+            weight = 1 - elapsed / self.window
+            if previous * weight + count >= self.limit:
+                if count >= self.limit:
+                    retry_after = self.window - elapsed
+                else:
+                    # Wait until enough of the previous window slides out
+                    retry_after = self.window * (1 - (self.limit - count) / previous) - elapsed
+                retry_after = max(1, math.ceil(retry_after))
+            else:
+                count += 1
+                retry_after = 0
+            self._keys[key] = (current, count, previous)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        return retry_after
+
+
+_lock = threading.Lock()
+
+
+def limiter(name):
+    """The app's limiter for ``name``, built from RATE_LIMITS on first use."""
+    limiters = current_app.extensions.setdefault('rate_limits', {})
+    if name not in limiters:
+        with _lock:
+            if name not in limiters:
+                limit, window = current_app.config['RATE_LIMITS'][name]
+                limiters[name] = SlidingWindowLimiter(
+                    limit, window, current_app.config.get('RATE_LIMIT_MAX_KEYS', 100000)
+                )
+    return limiters[name]
+
+
+def client_ip():
+    return request.remote_addr
+
+
+def json_field(field):
+    def key():
+        data = request.get_json(silent=True)
+        value = data.get(field) if isinstance(data, dict) else None
+        return value.lower() if isinstance(value, str) else None
+    return key
+
+
+def rate_limit(name, key_func):
+    """Throttle a resource method per ``key_func()`` under RATE_LIMITS[name].
+
+    Requests without a key (e.g. no username in the body) are not counted.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if current_app.config.get('RATE_LIMITS', {}).get(name):
+                key = key_func()
+                retry_after = limiter(name).hit(key) if key is not None else 0
+                if retry_after:
+                    return {'message': 'Too many requests, please retry later'}, 429, \
+                        {'Retry-After': str(retry_after)}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
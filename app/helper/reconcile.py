@@ -0,0 +1,162 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from sqlalchemy import create_engine, select
+from app.models import Payment
+from app.helper.webhooks import STATUS_RANK
+import csv
+
+# Settlement report columns per gateway, and the row types we understand
+REPORT_COLUMNS = {
+    'stripe': {
+        'transaction_id': 'payment_intent_id',
+        'amount': 'gross',
+        'currency': 'currency',
+        'type': 'reporting_category',
+    },
+    'razorpay': {
+        'transaction_id': 'entity_id',
+        'amount': 'amount',
+        'currency': 'currency',
+        'type': 'type',
+    },
+}
+REPORT_STATUSES = {
+    'stripe': {'charge': 'completed', 'refund': 'refunded'},
+    'razorpay': {'payment': 'completed', 'refund': 'refunded'},
+}
+
+DISCREPANCY_FIELDS = ['transaction_id', 'payment_id', 'issue', 'report_value', 'payment_value']
+
+_engine = None
+
+
+class ReconcileError(ValueError):
+    pass
+
+
+def read_report(path, gateway, chunk_size):
+    """Yield the report as lists of (transaction_id, amount, currency, status)
+    tuples, ``chunk_size`` rows at a time; rows of other types are skipped."""
+    columns = REPORT_COLUMNS[gateway]
+    statuses = REPORT_STATUSES[gateway]
+    with open(path, newline='', encoding='utf-8') as report:
+        reader = csv.DictReader(report)
+        missing = set(columns.values()) - set(reader.fieldnames or ())
+        if missing:
+            raise ReconcileError(f"Report is missing columns: {', '.join(sorted(missing))}")
+        rows = (
+            (row[columns['transaction_id']], row[columns['amount']],
+             row[columns['currency']], statuses[row[columns['type']]])
+            for row in reader
+            if row[columns['type']] in statuses and row[columns['transaction_id']]
+        )
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _amount(value):
+    try:
+        return abs(Decimal(value)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def check_chunk(connection, chunk):
+    """Compare one chunk of report rows with the payments they name.
+
+    Payments are fetched with one query on the unique transaction_id index.
+    Returns ``(discrepancies, updates)``: rows for the discrepancy report,
+    and ``{transaction_id, payment_id, status}`` items for payments the
+    report shows further along than we have them.
+    """
+    payments = Payment.__table__
+    found = {
+        row.transaction_id: row for row in connection.execute(
+            select(payments.c.id, payments.c.transaction_id, payments.c.amount,
+                   payments.c.currency, payments.c.payment_status)
+            .where(payments.c.transaction_id.in_({row[0] for row in chunk}))
+        )
+    }
+    discrepancies = []
+    updates = {}
+    for transaction_id, amount, currency, status in chunk:
+        payment = found.get(transaction_id)
+        if payment is None:
+            discrepancies.append([transaction_id, None, 'missing_payment', amount, None])
+            continue
+        if status == 'completed' and _amount(amount) != _amount(str(payment.amount)):
+            discrepancies.append([transaction_id, payment.id, 'amount_mismatch', amount, payment.amount])
+        if currency.upper() != payment.currency.upper():
+            discrepancies.append([transaction_id, payment.id, 'currency_mismatch', currency, payment.currency])
+        current = STATUS_RANK.get(payment.payment_status, 0)
+        if STATUS_RANK[status] > max(current, STATUS_RANK.get(updates.get(transaction_id, {}).get('status'), 0)):
+            updates[transaction_id] = {"transaction_id": transaction_id, "payment_id": payment.id, "status": status}
+        elif STATUS_RANK[status] < current:
+            discrepancies.append([transaction_id, payment.id, 'status_mismatch', status, payment.payment_status])
+    return discrepancies, list(updates.values())
+
+
+def _init_worker(database_uri):
+    global _engine
+    _engine = create_engine(database_uri)
+
+
+def _check_chunk(chunk):
+    with _engine.connect() as connection:
+        return check_chunk(connection, chunk)
+
+
+def reconcile(path, gateway, output, chunk_size=5000, workers=0, database_uri=None):
+    """Stream a settlement report against the payment table.
+
+    Chunks are checked on ``workers`` processes (inline when 0) with at most
+    two chunks per worker in flight, so memory stays flat whatever the
+    report's size. Discrepancies are written to the ``output`` CSV as chunks
+    finish; status updates are applied and committed per chunk by this
+    process with ``webhooks.apply_events``. Returns a count per outcome.
+    """
+    from app.extensions import db
+    from app.helper import webhooks
+    if gateway not in REPORT_COLUMNS:
+        raise ReconcileError(f"No settlement report format for {gateway}")
+    totals = {"rows": 0, "discrepancies": 0, "updated": 0}
+
+    def record(chunk_rows, result):
+        discrepancies, updates = result
+        writer.writerows(discrepancies)
+        totals["rows"] += chunk_rows
+        totals["discrepancies"] += len(discrepancies)
+        if updates:
+            try:
+                results, _ = webhooks.apply_events(updates)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            totals["updated"] += results.count("applied")
+
+    with open(output, 'w', newline='', encoding='utf-8') as report:
+        writer = csv.writer(report)
+        writer.writerow(DISCREPANCY_FIELDS)
+        chunks = read_report(path, gateway, chunk_size)
+        if not workers:
+            for chunk in chunks:
+                record(len(chunk), check_chunk(db.session.connection(), chunk))
+            return totals
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(database_uri,)) as executor:
+            pending = {}
+            for chunk in chunks:
+                if len(pending) >= 2 * workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(pending.pop(future), future.result())
+                pending[executor.submit(_check_chunk, chunk)] = len(chunk)
+            for future in list(pending):
+                record(pending.pop(future), future.result())
+    return totals
@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from flask import current_app
+import hashlib
+import math
+import threading
+import time
+
+
+class RevocationStore(ABC):
+    """Where revoked JWT ids live until their token expires."""
+
+    def init_app(self, app):
+        pass
+
+    @abstractmethod
+    def revoke(self, jti, expires_at):
+        pass
+
+    @abstractmethod
+    def is_revoked(self, jti):
+        pass
+
+    @abstractmethod
+    def revoked_since(self, since):
+        """Ids of unexpired revocations made after ``since`` (all when None)."""
+
+
+class DatabaseRevocationStore(RevocationStore):
+    """Revocations in the revoked_token table, shared by every worker."""
+
+    def revoke(self, jti, expires_at):
+        from app.extensions import db
+        from app.models import RevokedToken
+        now = datetime.utcnow()
+        RevokedToken.query.filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        if not db.session.get(RevokedToken, jti):
+            db.session.add(RevokedToken(jti=jti, revoked_at=now, expires_at=expires_at))
+        db.session.commit()
+
+    def is_revoked(self, jti):
+        from app.extensions import db
+        from app.models import RevokedToken
+        return db.session.query(RevokedToken.jti).filter(
+            RevokedToken.jti == jti,
+            RevokedToken.expires_at > datetime.utcnow()
+        ).first() is not None
+
+    def revoked_since(self, since):
+        from app.extensions import db
+        from app.models import RevokedToken
+        query = db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > datetime.utcnow())
+        if since is not None:
+            query = query.filter(RevokedToken.revoked_at >= since)
+        return [jti for (jti,) in query]
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class BloomRevocationStore(RevocationStore):
+    """A Bloom filter in front of another store.
+
+    A token the filter has never seen is not revoked, so the common check
+    costs no I/O; filter hits are confirmed against the backing store.
+    Revocations made by other workers are pulled in every
+    ``REVOCATION_SYNC_SECONDS``, and the filter is rebuilt from the live
+    rows every ``REVOCATION_REBUILD_SECONDS`` so expired ids drop out.
+    While a sync is failing every check goes to the backing store, so a
+    missed revocation is never reported as valid.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.capacity = 100000
+        self.error_rate = 0.001
+        self.sync_interval = 5
+        self.rebuild_interval = 3600
+        self._reset()
+
+    def init_app(self, app):
+        self.store.init_app(app)
+        self.capacity = app.config.get('REVOCATION_BLOOM_CAPACITY', self.capacity)
+        self.error_rate = app.config.get('REVOCATION_BLOOM_ERROR_RATE', self.error_rate)
+        self.sync_interval = app.config.get('REVOCATION_SYNC_SECONDS', self.sync_interval)
+        self.rebuild_interval = app.config.get('REVOCATION_REBUILD_SECONDS', self.rebuild_interval)
+        self._reset()
+        app.extensions['revocations'] = self
+
+    def _reset(self):
+        with self._lock:
+            self._filter = None
+            self._synced_at = None
+            self._next_sync = 0
+            self._next_rebuild = 0
+
+    def _sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            started = datetime.utcnow()
+            if self._filter is None or now >= self._next_rebuild:
+                jtis = self.store.revoked_since(None)
+                bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+                self._next_rebuild = now + self.rebuild_interval
+            else:
+                # Overlap by one interval so commits that raced the last sync are seen
+                jtis = self.store.revoked_since(self._synced_at - timedelta(seconds=self.sync_interval))
+                bloom = self._filter
+            for jti in jtis:
+                bloom.add(jti)
+            self._filter = bloom
+            self._synced_at = started
+            self._next_sync = now + self.sync_interval
+
+    def _try_sync(self):
+        """Sync the filter; False when it can't be trusted right now."""
+        try:
+            self._sync()
+        except Exception:
+            current_app.logger.exception("Revocation filter sync failed; checking the store directly")
+            return False
+        return self._filter is not None
+
+    def revoke(self, jti, expires_at):
+        self.store.revoke(jti, expires_at)
+        if self._try_sync():
+            with self._lock:
+                self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        if self._try_sync() and jti not in self._filter:
+            return False
+        return self.store.is_revoked(jti)
+
+    def revoked_since(self, since):
+        return self.store.revoked_since(since)
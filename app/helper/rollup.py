@@ -0,0 +1,106 @@
+from sqlalchemy import func, select, update, insert as sql_insert
+from app.extensions import db
+from app.models import Booking, DailyBookingStat
+
+# Incremental upkeep of daily_booking_stats: every booking write adds its
+# (count, revenue, duration) to the bucket for its date, service and status,
+# and a status change moves it from the old bucket to the new one.
+
+
+def _upsert():
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def apply_deltas(deltas):
+    """Add ``{(date, service_id, status): [count, revenue, duration]}`` to the
+    rollup in the caller's transaction."""
+    deltas = {key: value for key, value in deltas.items() if any(value)}
+    if not deltas:
+        return
+    values = [
+        {
+            "date": day, "service_id": service_id, "status": status,
+            "count": count, "revenue": revenue, "total_duration": duration
+        }
+        for (day, service_id, status), (count, revenue, duration) in deltas.items()
+    ]
+    insert = _upsert()
+    if insert:
+        statement = insert(DailyBookingStat).values(values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['date', 'service_id', 'status'],
+            set_={
+                "count": DailyBookingStat.count + statement.excluded.count,
+                "revenue": DailyBookingStat.revenue + statement.excluded.revenue,
+                "total_duration": DailyBookingStat.total_duration + statement.excluded.total_duration
+            }
+        ))
+        return
+    for value in values:
+        result = db.session.execute(
+            update(DailyBookingStat).where(
+                DailyBookingStat.date == value['date'],
+                DailyBookingStat.service_id == value['service_id'],
+                DailyBookingStat.status == value['status']
+            ).values(
+                count=DailyBookingStat.count + value['count'],
+                revenue=DailyBookingStat.revenue + value['revenue'],
+                total_duration=DailyBookingStat.total_duration + value['total_duration']
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        if not result.rowcount:
+            db.session.execute(sql_insert(DailyBookingStat).values(value))
+
+
+def _add(deltas, booking, status, sign):
+    bucket = deltas.setdefault((booking.date, booking.service_id, status), [0, 0.0, 0])
+    bucket[0] += sign
+    bucket[1] += sign * booking.total_amount
+    bucket[2] += sign * booking.duration
+
+
+def booking_created(booking):
+    deltas = {}
+    _add(deltas, booking, booking.status, 1)
+    apply_deltas(deltas)
+
+
+def status_changes(changes):
+    """``changes`` is an iterable of (booking, old_status, new_status); booking
+    only needs date, service_id, total_amount and duration."""
+    deltas = {}
+    for booking, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        _add(deltas, booking, old_status, -1)
+        _add(deltas, booking, new_status, 1)
+    apply_deltas(deltas)
+
+
+def backfill():
+    """Rebuild the whole rollup from the booking table."""
+    DailyBookingStat.query.delete()
+    grouped = select(
+        Booking.date,
+        Booking.service_id,
+        Booking.status,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.total_amount), 0),
+        func.coalesce(func.sum(Booking.duration), 0)
+    ).group_by(Booking.date, Booking.service_id, Booking.status)
+    db.session.execute(
+        sql_insert(DailyBookingStat).from_select(
+            ['date', 'service_id', 'status', 'count', 'revenue', 'total_duration'],
+            grouped
+        )
+    )
+    db.session.commit()
+    return DailyBookingStat.query.count()
@@ -0,0 +1,106 @@
+from sqlalchemy import event, text
+from app.extensions import db
+from app.models import Service
+import re
+
+# Full-text index over service_name and description. SQLite keeps an
+# external-content FTS5 table in step with service through triggers;
+# PostgreSQL keeps a generated tsvector column under a GIN index. Either
+# way the index is updated by the database on every insert, update and
+# delete, so the application never scans with LIKE.
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS service_fts USING fts5(
+        service_name, description,
+        content='service', content_rowid='rowid', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_insert AFTER INSERT ON service BEGIN
+        INSERT INTO service_fts(rowid, service_name, description)
+        VALUES (new.rowid, new.service_name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_delete AFTER DELETE ON service BEGIN
+        INSERT INTO service_fts(service_fts, rowid, service_name, description)
+        VALUES ('delete', old.rowid, old.service_name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_update AFTER UPDATE OF service_name, description ON service BEGIN
+        INSERT INTO service_fts(service_fts, rowid, service_name, description)
+        VALUES ('delete', old.rowid, old.service_name, old.description);
+        INSERT INTO service_fts(rowid, service_name, description)
+        VALUES (new.rowid, new.service_name, new.description);
+    END""",
+]
+
+POSTGRES_DDL = [
+    """ALTER TABLE service ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(service_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_service_search_vector ON service USING GIN (search_vector)",
+]
+
+SEARCH_SQL = {
+    # bm25 is lower-is-better; name matches weigh four times the description
+    'sqlite': """SELECT service.* FROM service_fts
+        JOIN service ON service.rowid = service_fts.rowid
+        WHERE service_fts MATCH :query
+        ORDER BY bm25(service_fts, 4.0, 1.0), service.id
+        LIMIT :limit""",
+    'postgresql': """SELECT service.* FROM service
+        WHERE search_vector @@ to_tsquery('english', :query)
+        ORDER BY ts_rank(search_vector, to_tsquery('english', :query)) DESC, service.id
+        LIMIT :limit""",
+}
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def install(connection):
+    """Create the index structures if missing (safe to re-run)."""
+    statements = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def rebuild():
+    """Install and repopulate the index, e.g. for a database created before it existed."""
+    with db.engine.begin() as connection:
+        install(connection)
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text("INSERT INTO service_fts(service_fts) VALUES ('rebuild')"))
+    return db.session.query(Service).count()
+
+
+@event.listens_for(Service.__table__, 'after_create')
+def _after_create(target, connection, **kw):
+    install(connection)
+
+
+@event.listens_for(Service.__table__, 'before_drop')
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS service_fts"))
+
+
+def terms(q):
+    """Words of the user's query; punctuation never reaches the FTS syntax."""
+    return re.findall(r'\w+', q.lower())
+
+
+def search(q, limit):
+    """Services matching every word of ``q`` (last word as a prefix), best first."""
+    words = terms(q)
+    if not words:
+        return []
+    dialect = db.engine.dialect.name
+    if dialect not in SEARCH_SQL:
+        raise SearchUnavailable(f"Full-text search is not supported on {dialect}")
+    if dialect == 'sqlite':
+        query = ' '.join(f'"{word}"' for word in words) + '*'
+    else:
+        query = ' & '.join(words) + ':*'
+    return db.session.query(Service).from_statement(
+        text(SEARCH_SQL[dialect]).bindparams(query=query, limit=limit)
+    ).all()
@@ -0,0 +1,99 @@
+from flask import current_app
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.extensions import db
+from app.models import Booking, Vehicle
+import zlib
+
+# Bookings in these states no longer hold a wash bay
+INACTIVE_STATUSES = ('cancelled',)
+
+
+class SlotError(ValueError):
+    pass
+
+
+def slot_end(booking_date, time_from, duration):
+    """Derive the end of a slot from the service duration (minutes)."""
+    start = datetime.combine(booking_date, time_from)
+    end = start + timedelta(minutes=duration)
+    if end.date() != booking_date:
+        raise SlotError("Booking must end before midnight")
+    return end.time()
+
+
+def bay_capacity(vehicle_type):
+    capacities = current_app.config.get('BAY_CAPACITY', {})
+    return capacities.get(vehicle_type, current_app.config.get('DEFAULT_BAY_CAPACITY', 1))
+
+
+def lock_day(booking_date):
+    """Serialize slot checks for one day; call before ``check_slot``.
+
+    PostgreSQL takes a transaction-scoped advisory lock per day. SQLite has
+    one writer lock for the whole database, but pysqlite only opens a
+    transaction at the first write, so the overlap SELECT would hold
+    nothing; the write lock is taken up front with BEGIN IMMEDIATE instead.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        key = zlib.crc32(booking_date.isoformat().encode('ascii'))
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {"key": key})
+    elif dialect == 'sqlite':
+        connection = db.session.connection().connection.driver_connection
+        # Already writing means the lock is already held
+        if not connection.in_transaction:
+            connection.execute('BEGIN IMMEDIATE')
+
+
+def overlapping_bookings(booking_date, time_from, time_to, exclude_id=None):
+    """Active bookings on ``booking_date`` that intersect [time_from, time_to).
+
+    Served by the (date, time_from) index: one range seek per check.
+    """
+    query = db.session.query(
+        Booking.vehicle_id,
+        Booking.time_from,
+        Booking.time_to,
+        Vehicle.vehicle_type
+    ).join(Vehicle, Vehicle.id == Booking.vehicle_id).filter(
+        Booking.date == booking_date,
+        Booking.time_from < time_to,
+        Booking.time_to > time_from,
+        Booking.status.notin_(INACTIVE_STATUSES)
+    )
+    if exclude_id:
+        query = query.filter(Booking.id != exclude_id)
+    return query.all()
+
+
+def peak_usage(intervals, time_from, time_to):
+    """Largest number of ``intervals`` running at once inside the window."""
+    events = []
+    for start, end in intervals:
+        events.append((max(start, time_from), 1))
+        events.append((min(end, time_to), -1))
+    # Ends sort before starts at the same instant: back-to-back slots don't overlap
+    events.sort(key=lambda event: (event[0], event[1]))
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def check_slot(booking_date, time_from, time_to, vehicle, exclude_id=None):
+    """Return an error message when the slot can't be booked, else None."""
+    rows = overlapping_bookings(booking_date, time_from, time_to, exclude_id)
+
+    if any(row.vehicle_id == vehicle.id for row in rows):
+        return "Vehicle is already booked for this slot"
+
+    same_type = [
+        (row.time_from, row.time_to)
+        for row in rows if row.vehicle_type == vehicle.vehicle_type
+    ]
+    if peak_usage(same_type, time_from, time_to) >= bay_capacity(vehicle.vehicle_type):
+        return "No wash bay available for this slot"
+
+    return None
@@ -0,0 +1,56 @@
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'role'])
+
+
+class UserCache:
+    """Bounded per-process cache of the user fields authorization needs.
+
+    Entries expire after ``ttl`` seconds and the least recently used one is
+    dropped once ``max_size`` is reached. Writers that change a user's
+    username or role must call ``invalidate``.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def init_app(self, app):
+        self.max_size = app.config.get('USER_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.clear()
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id):
+        """Cached user for ``user_id``, loading it on a miss; None if unknown."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        from app.extensions import db
+        from app.models import User
+        row = db.session.query(User.id, User.username, User.role).filter(User.id == user_id).first()
+        if not row:
+            return None
+        user = CachedUser(*row)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,97 @@
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class WebhookBatcher:
+    """Group-commits webhook events.
+
+    Request threads ``submit`` their parsed events and wait; a single writer
+    thread collects whatever arrives within ``WEBHOOK_BATCH_WAIT_MS`` (up to
+    ``WEBHOOK_BATCH_SIZE`` events), applies it with
+    ``webhooks.apply_events`` and commits once, then answers every waiting
+    request. Gateways are only acknowledged after the commit, so nothing is
+    lost if the process dies mid-batch. A batch that fails is retried one
+    delivery at a time so a bad event only fails its own request. A batch
+    size of 1 applies each delivery inline on the request thread.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.app = None
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('WEBHOOK_BATCH_SIZE', 200)
+        self.max_wait = app.config.get('WEBHOOK_BATCH_WAIT_MS', 20) / 1000
+        self.timeout = app.config.get('WEBHOOK_APPLY_TIMEOUT_SECONDS', 10)
+        app.extensions['webhook_batcher'] = self
+
+    def submit(self, items):
+        """Results for ``items`` once they are committed; raises
+        concurrent.futures.TimeoutError if the writer falls behind."""
+        if not items:
+            return []
+        if self.batch_size <= 1:
+            return self.apply(items)
+        self._start()
+        future = Future()
+        self._queue.put((items, future))
+        return future.result(timeout=self.timeout)
+
+    def apply(self, items):
+        """Apply and commit one batch, then publish its changes."""
+        from app.extensions import db, events
+        from app.helper import webhooks
+        try:
+            results, changes = webhooks.apply_events(items)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for change in changes:
+            events.publish('payment.status_changed', change)
+        return results
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            size += len(batch[-1][0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            with self.app.app_context():
+                try:
+                    results = self.apply([item for items, _ in batch for item in items])
+                except Exception:
+                    self.app.logger.exception("Webhook batch of %d deliveries failed; retrying singly", len(batch))
+                    for items, future in batch:
+                        try:
+                            future.set_result(self.apply(items))
+                        except Exception as error:
+                            future.set_exception(error)
+                    continue
+            offset = 0
+            for items, future in batch:
+                future.set_result(results[offset:offset + len(items)])
+                offset += len(items)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='webhook-batcher', daemon=True)
+                self._thread.start()
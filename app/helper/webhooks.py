@@ -0,0 +1,271 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update, bindparam, or_, tuple_
+from app.extensions import db
+from app.models import Booking, Payment, Vehicle
+from app.helper import availability
+from app.helper import rollup
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+# Gateway event type -> payment status it reports
+EVENT_STATUSES = {
+    'stripe': {
+        'payment_intent.succeeded': 'completed',
+        'payment_intent.payment_failed': 'failed',
+        'charge.refunded': 'refunded',
+    },
+    'razorpay': {
+        'payment.captured': 'completed',
+        'payment.failed': 'failed',
+        'refund.processed': 'refunded',
+    },
+}
+
+# A payment only moves forward; an event ranked at or below what the payment
+# already records for the same transaction is a redelivery
+STATUS_RANK = {'failed': 1, 'completed': 2, 'refunded': 3}
+
+# Payment status -> (booking status, booking statuses it may move from)
+BOOKING_CHANGES = {
+    'completed': ('confirmed', ('pending',)),
+    'refunded': ('cancelled', ('pending', 'confirmed', 'startservice')),
+}
+
+# Headers the signature checks need, kept with archived deliveries
+SIGNATURE_HEADERS = ('Stripe-Signature', 'X-Razorpay-Signature')
+
+_archive_lock = threading.Lock()
+
+
+class UnknownGateway(LookupError):
+    pass
+
+
+class SignatureError(ValueError):
+    pass
+
+
+def _secret(gateway):
+    if gateway not in EVENT_STATUSES:
+        raise UnknownGateway(f"No webhooks are accepted for {gateway}")
+    secret = current_app.config.get('WEBHOOK_SECRETS', {}).get(gateway)
+    if not secret:
+        raise SignatureError(f"No webhook secret is configured for {gateway}")
+    return secret.encode()
+
+
+def _digest(secret, payload):
+    return hmac.new(secret, payload, hashlib.sha256).hexdigest()
+
+
+def verify(gateway, body, headers, tolerance=None):
+    """Check the delivery's HMAC-SHA256 signature with the gateway's secret.
+
+    Stripe signs ``<timestamp>.<body>`` and the timestamp must be within
+    ``tolerance`` seconds (None skips the age check, for replays); Razorpay
+    signs the body.
+    """
+    secret = _secret(gateway)
+    if gateway == 'stripe':
+        parts = [part.partition('=') for part in headers.get('Stripe-Signature', '').split(',')]
+        timestamp = next((value for key, _, value in parts if key == 't'), '')
+        signatures = [value for key, _, value in parts if key == 'v1']
+        if not timestamp.isdigit() or not signatures:
+            raise SignatureError("Malformed Stripe-Signature header")
+        if tolerance is not None and abs(time.time() - int(timestamp)) > tolerance:
+            raise SignatureError("Signature timestamp is outside the tolerance")
+        expected = _digest(secret, timestamp.encode() + b'.' + body)
+        if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+            raise SignatureError("Signature does not match")
+    else:
+        signature = headers.get('X-Razorpay-Signature', '')
+        if not hmac.compare_digest(_digest(secret, body), signature):
+            raise SignatureError("Signature does not match")
+
+
+def parse(gateway, payload):
+    """Normalise a verified delivery into ``{transaction_id, payment_id,
+    status}`` events; types we don't act on give an empty list.
+
+    ``payment_id`` is our payment id when the gateway echoes it back in
+    metadata/notes; later events find the payment by transaction_id.
+    """
+    status = EVENT_STATUSES[gateway].get(payload.get('type') or payload.get('event'))
+    if not status:
+        return []
+    if gateway == 'stripe':
+        entity = payload.get('data', {}).get('object', {})
+        transaction_id = entity.get('payment_intent') if status == 'refunded' else entity.get('id')
+        metadata = entity.get('metadata') or {}
+    else:
+        entities = payload.get('payload', {})
+        if status == 'refunded':
+            entity = entities.get('refund', {}).get('entity', {})
+            transaction_id = entity.get('payment_id')
+        else:
+            entity = entities.get('payment', {}).get('entity', {})
+            transaction_id = entity.get('id')
+        metadata = entity.get('notes') or {}
+    if not transaction_id:
+        return []
+    return [{
+        "transaction_id": transaction_id,
+        "payment_id": metadata.get('payment_id'),
+        "status": status
+    }]
+
+
+def archive(gateway, headers, body):
+    """Append a verified delivery to today's archive file, if archiving is on.
+
+    Files are ``<gateway>-<YYYYMMDD>-<pid>.ndjson`` so worker processes never
+    share one; 'flask replay-webhooks' reads them back.
+    """
+    directory = current_app.config.get('WEBHOOK_ARCHIVE_DIR')
+    if not directory:
+        return
+    record = json.dumps({
+        "gateway": gateway,
+        "received_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        "headers": {name: headers[name] for name in SIGNATURE_HEADERS if name in headers},
+        "body": body.decode('utf-8')
+    })
+    path = os.path.join(directory, f"{gateway}-{datetime.utcnow():%Y%m%d}-{os.getpid()}.ndjson")
+    with _archive_lock:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as archive_file:
+            archive_file.write(record + '\n')
+
+
+def read_archive(path):
+    """Yield the events of every delivery in an archive file, re-verified."""
+    with open(path, encoding='utf-8') as archive_file:
+        for line in archive_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            body = record['body'].encode('utf-8')
+            verify(record['gateway'], body, record.get('headers', {}))
+            yield from parse(record['gateway'], json.loads(body))
+
+
+def apply_events(items):
+    """Apply a batch of parsed events in the caller's transaction.
+
+    Payments are read (and locked where supported) in one query, each
+    payment keeps only the furthest-along event of the batch, and the
+    payment and booking rows are written with one executemany and one
+    UPDATE per booking status. Returns ``(results, changes)``: a result per
+    item, in order, and the ``payment.status_changed`` payloads to publish
+    once the caller has committed.
+    """
+    transaction_ids = {item['transaction_id'] for item in items}
+    payment_ids = {item['payment_id'] for item in items if item.get('payment_id')}
+    rows = db.session.query(
+        Payment.id, Payment.transaction_id, Payment.payment_status, Payment.booking_id
+    ).filter(or_(Payment.transaction_id.in_(transaction_ids), Payment.id.in_(payment_ids))) \
+        .with_for_update().all()
+    by_transaction = {row.transaction_id: row for row in rows if row.transaction_id}
+    by_id = {row.id: row for row in rows}
+
+    results = []
+    winners = {}
+    for index, item in enumerate(items):
+        row = by_transaction.get(item['transaction_id']) or by_id.get(item.get('payment_id'))
+        rank = STATUS_RANK[item['status']]
+        if not row:
+            results.append("unmatched")
+            continue
+        if row.transaction_id == item['transaction_id']:
+            if STATUS_RANK.get(row.payment_status, 0) >= rank:
+                results.append("duplicate")
+                continue
+        elif row.transaction_id and row.payment_status != 'failed':
+            # Linked to another gateway transaction that didn't fail
+            results.append("conflict")
+            continue
+        # Later events in the batch may carry only the transaction id
+        by_transaction.setdefault(item['transaction_id'], row)
+        current = winners.get(row.id)
+        if current is not None:
+            if STATUS_RANK[items[current]['status']] >= rank:
+                results.append("duplicate")
+                continue
+            results[current] = "duplicate"
+        winners[row.id] = index
+        results.append("applied")
+
+    if not winners:
+        return results, []
+
+    now = datetime.utcnow()
+    payments = Payment.__table__
+    db.session.execute(
+        update(payments)
+        .where(payments.c.id == bindparam('target_id'))
+        .values(payment_status=bindparam('target_status'),
+                transaction_id=bindparam('target_transaction_id'),
+                version=payments.c.version + 1, updated_at=now),
+        [
+            {"target_id": payment_id, "target_status": items[index]['status'],
+             "target_transaction_id": items[index]['transaction_id']}
+            for payment_id, index in winners.items()
+        ]
+    )
+
+    payment_status = {by_id[payment_id].booking_id: items[index]['status'] for payment_id, index in winners.items()}
+    bookings = {
+        row.id: row for row in db.session.query(
+            Booking.id, Booking.status, Booking.version, Booking.date, Booking.time_from,
+            Booking.time_to, Booking.service_id, Booking.total_amount,
+            Booking.duration, Vehicle.vehicle_type
+        ).join(Vehicle, Vehicle.id == Booking.vehicle_id)
+        .filter(Booking.id.in_(payment_status))
+        .with_for_update(of=Booking)
+    }
+
+    targets = {}
+    for booking_id, status in payment_status.items():
+        row = bookings.get(booking_id)
+        change = BOOKING_CHANGES.get(status)
+        if row and change and row.status in change[1]:
+            targets.setdefault(change[0], []).append(row)
+
+    new_status = {}
+    for status, booking_rows in targets.items():
+        updated = db.session.execute(
+            update(Booking)
+            .where(tuple_(Booking.id, Booking.version).in_([(row.id, row.version) for row in booking_rows]))
+            .values(status=status, version=Booking.version + 1, updated_at=now),
+            execution_options={"synchronize_session": False}
+        )
+        if updated.rowcount != len(booking_rows):
+            # A staff write got in first; leave those bookings as they are
+            applied = {
+                booking_id for (booking_id,) in db.session.query(Booking.id).filter(
+                    tuple_(Booking.id, Booking.version).in_([(row.id, row.version + 1) for row in booking_rows]),
+                    Booking.status == status
+                )
+            }
+            booking_rows = [row for row in booking_rows if row.id in applied]
+        if status == 'cancelled':
+            for row in booking_rows:
+                availability.release(row.date, row.vehicle_type, row.time_from, row.time_to)
+        rollup.status_changes((row, row.status, status) for row in booking_rows)
+        new_status.update((row.id, status) for row in booking_rows)
+
+    changes = []
+    for booking_id, status in payment_status.items():
+        old_status = bookings[booking_id].status if booking_id in bookings else None
+        changes.append({
+            "booking_id": booking_id,
+            "payment_status": status,
+            "old_booking_status": old_status,
+            "booking_status": new_status.get(booking_id, old_status)
+        })
+    return results, changes
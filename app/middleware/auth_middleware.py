@@ -1,72 +1,39 @@
 from functools import wraps
-from flask_jwt_extended import get_jwt_identity
-from app.models import User
-import uuid
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.extensions import user_cache
 
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            user_id = get_jwt_identity()
-            current_user = User.query.filter_by(id=user_id).first()
-            print(current_user)
-            if not current_user or current_user.role != 'admin':
-                return {'message': 'Admin token required'}, 403
-                
-            return f(*args, **kwargs)
-        except ValueError:
-            return {'message': 'Invalid user ID'}, 400
-        except Exception as e:
-            return {'message': 'Authentication error', 'error': str(e)}, 500
-    return decorated_function
+def current_role():
+    """Role of the caller, taken from the verified token claims.
 
-def staff_admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            user_id = get_jwt_identity()
-            current_user = User.query.filter_by(id=user_id).first()
-            
-            if not current_user or current_user.role not in ['admin', 'staff']:
-                return {'message': 'Staff or Admin token required'}, 403
-                
-            return f(*args, **kwargs)
-        except ValueError:
-            return {'message': 'Invalid user ID'}, 400
-        except Exception as e:
-            return {'message': 'Authentication error', 'error': str(e)}, 500
-    return decorated_function
+    Tokens issued without a role claim fall back to the user cache, so the
+    check never needs a query per request.
+    """
+    role = get_jwt().get('role')
+    if role:
+        return role
+    user = user_cache.get(get_jwt_identity())
+    return user.role if user else None
 
-def user_admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            user_id = get_jwt_identity()
-            current_user = User.query.filter_by(id=user_id).first()
-            
-            if not current_user or current_user.role not in ['admin', 'user']:
-                return {'message': 'User or Admin token required'}, 403
-                
-            return f(*args, **kwargs)
-        except ValueError:
-            return {'message': 'Invalid user ID'}, 400
-        except Exception as e:
-            return {'message': 'Authentication error', 'error': str(e)}, 500
-    return decorated_function
+def role_required(roles, message):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                if current_role() not in roles:
+                    return {'message': message}, 403
 
-def user_staff_admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            user_id = get_jwt_identity()
-            current_user = User.query.filter_by(id=user_id).first()
-            
-            if not current_user or current_user.role not in ['admin', 'staff', 'user']:
-                return {'message': 'Authentication required'}, 403
-                
-            return f(*args, **kwargs)
-        except ValueError:
-            return {'message': 'Invalid user ID'}, 400
-        except Exception as e:
-            return {'message': 'Authentication error', 'error': str(e)}, 500
-    return decorated_function 
\ No newline at end of file
+                return f(*args, **kwargs)
+            except ValueError:
+                return {'message': 'Invalid user ID'}, 400
+            except Exception as e:
+                return {'message': 'Authentication error', 'error': str(e)}, 500
+        return decorated_function
+    return decorator
+
+admin_required = role_required(('admin',), 'Admin token required')
+
+staff_admin_required = role_required(('admin', 'staff'), 'Staff or Admin token required')
+
+user_admin_required = role_required(('admin', 'user'), 'User or Admin token required')
+
+user_staff_admin_required = role_required(('admin', 'staff', 'user'), 'Authentication required')
@@ -1,7 +1,9 @@
 from app.extensions import db
+from sqlalchemy.orm import validates, deferred
 from datetime import datetime
-import json
 import uuid
+from app.helper.numberplate import normalize as normalize_plate
+from app.helper.compressed_json import CompressedJSON
 
 def get_uuid():
     return str(uuid.uuid4())
@@ -12,7 +14,8 @@ class User(db.Model):
     profile_image = db.Column(db.String(255), nullable=True)
     profile_image_id = db.Column(db.String(255), nullable=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
-    phonenumber = db.Column(db.String(15), nullable=False)
+    # Indexed for signup uniqueness checks and prefix search on /users
+    phonenumber = db.Column(db.String(15), nullable=False, index=True)
     password = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(10), nullable=False)
 
@@ -26,10 +29,23 @@ class Vehicle(db.Model):
     vehicle_name = db.Column(db.String(100), nullable=False)
     vehicle_model = db.Column(db.String(100), nullable=False)
     numberplate = db.Column(db.String(50), unique=True, nullable=False)
+    # numberplate without case, spaces or punctuation; see app/helper/numberplate.py
+    plate_key = db.Column(db.String(50), unique=True, index=True)
     vehicle_type = db.Column(db.String(10), nullable=False)
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref='vehicles')
 
+    @validates('numberplate')
+    def _set_plate_key(self, key, numberplate):
+        self.plate_key = normalize_plate(numberplate)
+        return numberplate
+
+    __table_args__ = (
+        # /vehicles and /all-vehicles?user_id= walk one owner's vehicles by id
+        db.Index('ix_vehicle_user_id', 'user_id', 'id'),
+        db.Index('ix_vehicle_type_id', 'vehicle_type', 'id'),
+    )
+
 class Service(db.Model):
     __tablename__ = 'service'
     id = db.Column(db.String(36), primary_key=True, default=get_uuid)
@@ -39,6 +55,11 @@ class Service(db.Model):
     duration = db.Column(db.Integer, nullable=False)
     vehicle_type = db.Column(db.String(10), nullable=False)
 
+    __table_args__ = (
+        # GET /services?vehicle_type=&min_price=&max_price=&sort=price
+        db.Index('ix_service_vehicle_type_price', 'vehicle_type', 'price'),
+    )
+
 class Booking(db.Model):
     __tablename__ = 'booking'
     id = db.Column(db.String(36), primary_key=True, default=get_uuid)
@@ -51,14 +72,48 @@ class Booking(db.Model):
     duration = db.Column(db.Integer, nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False, default='pending')
+    # Bumped on every write; exposed as the ETag for conditional requests
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Keyset pagination walks (date, created_at, id), per user and globally
+    __table_args__ = (
+        db.Index('ix_booking_user_date_created', 'user_id', 'date', 'created_at', 'id'),
+        db.Index('ix_booking_date_created', 'date', 'created_at', 'id'),
+        # Slot conflict checks range-scan one day by start time
+        db.Index('ix_booking_date_time', 'date', 'time_from'),
+    )
+
     # Relationships
     user = db.relationship('User', backref='bookings')
     service = db.relationship('Service', backref='bookings')
     vehicle = db.relationship('Vehicle', backref='bookings')
 
+class CacheVersion(db.Model):
+    """Version counters for in-process caches, bumped by writers so every
+    worker notices a change, see app/helper/catalog_cache.py"""
+    __tablename__ = 'cache_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class SlotMap(db.Model):
+    """Per-day wash bay occupancy bitmaps, see app/helper/availability.py"""
+    __tablename__ = 'slot_map'
+    vehicle_type = db.Column(db.String(10), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    layers = db.Column(db.Text, nullable=False, default='')
+
+class DailyBookingStat(db.Model):
+    """Daily booking volume and revenue rollup, see app/helper/rollup.py"""
+    __tablename__ = 'daily_booking_stats'
+    date = db.Column(db.Date, primary_key=True)
+    service_id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+
 class Payment(db.Model):
     __tablename__ = 'payment'
     id = db.Column(db.String(36), primary_key=True, default=get_uuid)
@@ -68,9 +123,53 @@ class Payment(db.Model):
     payment_method = db.Column(db.String(20), nullable=False)
     payment_status = db.Column(db.String(20), nullable=False, default='pending')
     transaction_id = db.Column(db.String(255), unique=True, nullable=True)
-    payment_response = db.Column(db.Text, nullable=True)
+    # Multi-KB gateway payload; only loaded when the attribute is read
+    payment_response = deferred(db.Column(CompressedJSON, nullable=True))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship
     booking = db.relationship('Booking', backref=db.backref('payment', uselist=False))
+
+class PaymentOutbox(db.Model):
+    """Gateway initialisations still to run for new payments, written in the
+    booking's transaction and drained by app/helper/payment_outbox.py"""
+    __tablename__ = 'payment_outbox'
+    id = db.Column(db.String(36), primary_key=True, default=get_uuid)
+    payment_id = db.Column(db.String(36), db.ForeignKey('payment.id'), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    payment = db.relationship('Payment')
+
+    __table_args__ = (
+        db.Index('ix_payment_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+class IdempotencyKey(db.Model):
+    """Responses replayed for retried requests carrying an Idempotency-Key"""
+    __tablename__ = 'idempotency_key'
+    id = db.Column(db.String(36), primary_key=True, default=get_uuid)
+    user_id = db.Column(db.String(36), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+    )
+
+class RevokedToken(db.Model):
+    """JWT ids revoked by logout, kept until the token would have expired"""
+    __tablename__ = 'revoked_token'
+    jti = db.Column(db.String(36), primary_key=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
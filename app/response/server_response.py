@@ -11,3 +11,9 @@ def unexcept_error(error):
                 "message": "An unexpected error occurred",
                 "error": str(error)
             }
+
+def busy_error(error):
+    return {
+                "message": "Server is busy, please retry shortly",
+                "error": str(error)
+            }
@@ -43,6 +43,16 @@ def user_all(user):
                 "users": user,
                 "total": len(user)
             }
+def service_to_dict(service):
+    return {
+        "id": str(service.id),
+        "service_name": service.service_name,
+        "description": service.description,
+        "price": service.price,
+        "duration": service.duration,
+        "vehicle_type": service.vehicle_type
+    }
+
 def vechile_list(vehicle):
     return {
         "id": str(vehicle.id),
@@ -2,16 +2,18 @@ from flask import Blueprint, request
 from flask_restful import Resource, Api
 from app.helper.body_validator import check_signup, check_login
 from app.models import User
-from app.extensions import db
-from app.helper.auth_helper import password_hash, access_token, refres_token
+from app.extensions import db, revocations
+from app.helper.auth_helper import password_hash, needs_rehash, access_token, refres_token
+from app.helper.password_pool import HasherBusy
+from app.helper.rate_limit import rate_limit, client_ip, json_field
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.response import success_response,server_response
+from datetime import datetime
 auth_bp = Blueprint('auth', __name__)
 api = Api(auth_bp)
 
-BLOCKLIST = set()
-
 class Signup(Resource):
+    @rate_limit('signup:ip', client_ip)
     def post(self):
         try:
             data = request.get_json()
@@ -31,27 +33,42 @@ class Signup(Resource):
                 db.session.commit()
                 return success_response.signup_response(new_user), 201
                 
+            except HasherBusy:
+                raise
             except Exception as db_error:
                 db.session.rollback()
                 return server_response.data_error(db_error) , 500
             
+        except HasherBusy as error:
+            return server_response.busy_error(error), 503, {'Retry-After': '1'}
         except Exception as error:
             return server_response.unexcept_error, 500
 
 class Login(Resource):
+    @rate_limit('login:ip', client_ip)
+    @rate_limit('login:username', json_field('username'))
     def post(self):
         try:
             data = request.get_json()
-            login_check = check_login(data)
-            if login_check:
-                return login_check
+            user, login_error = check_login(data)
+            if login_error:
+                return login_error
             
-            user = User.query.filter_by(username=data["username"]).first()
+            if needs_rehash(user.password):
+                # Hash parameters changed since this password was stored;
+                # upgrading it can wait for a quieter login if the pool is full
+                try:
+                    user.password = password_hash(data["password"])
+                    db.session.commit()
+                except HasherBusy:
+                    pass
 
             access_token_str = access_token(user)
             refresh_token_str = refres_token(user)
             
             return success_response.login_response(access_token_str,refresh_token_str), 200
+        except HasherBusy as error:
+            return server_response.busy_error(error), 503, {'Retry-After': '1'}
         except Exception as error:
             return server_response.unexcept_error(error), 500
 
@@ -59,8 +76,8 @@ class Logout(Resource):
     @jwt_required()
     def post(self):
         try:
-            jti = get_jwt()["jti"]  
-            BLOCKLIST.add(jti)
+            claims = get_jwt()
+            revocations.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
             return {"message": "Successfully logged out"}, 200
         except Exception as error:
             return server_response.unexcept_error(error), 500
@@ -69,8 +86,8 @@ class LogoutRefresh(Resource):
     @jwt_required(refresh=True)
     def post(self):
         try:
-            jti = get_jwt()["jti"] 
-            BLOCKLIST.add(jti)
+            claims = get_jwt()
+            revocations.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
             return {"message": "Refresh token revoked"}, 200
         except Exception as error:
             return server_response.unexcept_error(error), 500
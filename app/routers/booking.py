@@ -1,53 +1,85 @@
-from flask import Blueprint, request, current_app
+from flask import Blueprint, request, current_app, Response, stream_with_context
 from flask_restful import Resource, Api
-from app.models import Booking, Service, Vehicle, Payment, User
-from app.extensions import db
+from app.models import Booking, Service, Vehicle, Payment
+from app.extensions import db, events, payment_outbox, user_cache
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.middleware.auth_middleware import admin_required, user_admin_required, staff_admin_required
-from app.helper.payment_helper import PaymentGateway
+from app.middleware.auth_middleware import admin_required, user_admin_required, staff_admin_required, current_role
+from app.helper.payment_helper import PAYMENT_METHODS
+from app.helper.pagination import PaginationError
+from app.helper import booking_projection
+from app.helper.slot_helper import SlotError, slot_end, lock_day, check_slot
+from app.helper import availability
+from app.helper import idempotency
+from app.helper import booking_status
+from app.helper import rollup
+from app.helper import conditional
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 import uuid
 from datetime import datetime
 from app.response import success_response,server_response
 import json
+import csv
 
 booking_bp = Blueprint('booking', __name__)
 api = Api(booking_bp)
 
+STATUS_ERROR_CODES = {
+    'invalid_status': 400,
+    'forbidden': 403,
+    'not_found': 404,
+    'invalid_transition': 409,
+    'version_conflict': 412
+}
+
+def update_status(booking_id, status, version=None):
+    """Single-booking status change shared by the staff endpoints.
+
+    ``version`` makes the change conditional (If-Match). Returns
+    (result, error_response); commits on success.
+    """
+    result = booking_status.apply_status_changes(
+        [{"booking_id": booking_id, "status": status, "version": version}], current_role()
+    )[0]
+    if result['result'] != 'updated':
+        db.session.rollback()
+        body = {"message": result['message']}
+        if 'valid_statuses' in result:
+            body['valid_statuses'] = result['valid_statuses']
+        return result, (body, STATUS_ERROR_CODES[result['result']])
+    db.session.commit()
+    publish_status_changes([result])
+    return result, None
+
+def publish_status_changes(results):
+    for result in results:
+        if result['result'] == 'updated':
+            events.publish('booking.status_changed', {
+                "id": result['booking_id'],
+                "old_status": result['old_status'],
+                "new_status": result['new_status']
+            })
+
 class BookingList(Resource):
     @jwt_required()
     def get(self):
         try:
             user_id = get_jwt_identity()
-            bookings = Booking.query.filter_by(user_id=user_id).all()
-            
-            bookings_data = [{
-                "id": str(booking.id),
-                "service": {
-                    "id": str(booking.service.id),
-                    "name": booking.service.service_name,
-                    "price": booking.service.price
-                },
-                "vehicle": {
-                    "id": str(booking.vehicle.id),
-                    "name": booking.vehicle.vehicle_name,
-                    "numberplate": booking.vehicle.numberplate
-                },
-                "date": booking.date.strftime('%Y-%m-%d'),
-                "time_from": booking.time_from.strftime('%H:%M'),
-                "time_to": booking.time_to.strftime('%H:%M'),
-                "duration": booking.duration,
-                "total_amount": booking.total_amount,
-                "status": booking.status,
-                "payment_status": booking.payment.payment_status if booking.payment else "no_payment",
-                "created_at": booking.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            } for booking in bookings]
+            rows, next_cursor = booking_projection.booking_page(
+                booking_projection.booking_query().filter(Booking.user_id == user_id),
+                request.args
+            )
+            bookings_data = [booking_projection.user_booking(row) for row in rows]
             
             return {
                 "message": "Bookings retrieved successfully",
                 "bookings": bookings_data,
-                "total": len(bookings_data)
+                "total": len(bookings_data),
+                "next_cursor": next_cursor
             }, 200
             
+        except PaginationError as error:
+            return {"message": str(error)}, 400
         except Exception as error:
             return server_response.data_error(error), 500
 
@@ -58,10 +90,22 @@ class BookingList(Resource):
             current_user_id = get_jwt_identity()
             data = request.get_json()
             
+            # A retried request with the same Idempotency-Key replays the first response
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if idempotency_key:
+                fingerprint = idempotency.fingerprint(data)
+                cached = idempotency.lookup(current_user_id, idempotency_key, fingerprint)
+                if cached:
+                    return cached
+            
             # Convert UUIDs to strings
             service_id = str(data['service_id'])
             vehicle_id = str(data['vehicle_id'])
             
+            payment_method = data.get('payment_method', 'stripe')
+            if payment_method not in PAYMENT_METHODS:
+                return {"message": "Invalid payment method"}, 400
+            
             # Validate service and vehicle
             service = Service.query.get(service_id)
             vehicle = Vehicle.query.get(vehicle_id)
@@ -73,12 +117,22 @@ class BookingList(Resource):
             if str(vehicle.user_id) != current_user_id:
                 return {"message": "Vehicle does not belong to user"}, 403
             
-            # Parse date and time
+            # Parse date and time; the slot length comes from the service
             booking_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
             time_from = datetime.strptime(data['time_from'], '%H:%M').time()
-            time_to = datetime.strptime(data['time_to'], '%H:%M').time()
-            
-            # Create booking
+            try:
+                time_to = slot_end(booking_date, time_from, service.duration)
+            except SlotError as error:
+                return {"message": str(error)}, 400
+            
+            # Reject double bookings of the vehicle or the wash bays
+            lock_day(booking_date)
+            conflict = check_slot(booking_date, time_from, time_to, vehicle)
+            if conflict:
+                return {"message": conflict}, 409
+            
+            # Booking, payment, slot bitmap and the payment outbox entry are
+            # committed as one unit of work; the gateway is called afterwards
             booking = Booking(
                 id=str(uuid.uuid4()),
                 user_id=current_user_id,
@@ -91,43 +145,21 @@ class BookingList(Resource):
                 total_amount=service.price,
                 status='pending'
             )
-            
-            db.session.add(booking)
-            db.session.commit()
-            
-            # Initialize payment
-            payment_method = data.get('payment_method', 'stripe')
-            
-            # Create payment intent/order
-            if payment_method == 'stripe':
-                payment_data = PaymentGateway.create_stripe_payment(service.price)
-            elif payment_method == 'razorpay':
-                payment_data = PaymentGateway.create_razorpay_payment(service.price)
-            elif payment_method == 'paypal':
-                payment_data = PaymentGateway.create_paypal_payment(service.price)
-            else:
-                return {"message": "Invalid payment method"}, 400
-            
-            if not payment_data.get('success'):
-                return {
-                    "message": "Payment initialization failed",
-                    "error": payment_data.get('error')
-                }, 400
-            
-            # Create payment record
             payment = Payment(
                 id=str(uuid.uuid4()),
                 booking_id=booking.id,
                 amount=service.price,
                 payment_method=payment_method,
-                payment_status='done',
-                payment_response=json.dumps(payment_data)  # Store payment data directly
+                payment_status='initializing'
             )
             
+            db.session.add(booking)
             db.session.add(payment)
-            db.session.commit()
+            payment_outbox.enqueue(payment)
+            availability.reserve(booking_date, vehicle.vehicle_type, time_from, time_to)
+            rollup.booking_created(booking)
             
-            return {
+            response = {
                 "message": "Booking created successfully",
                 "booking": {
                     "id": booking.id,
@@ -148,11 +180,39 @@ class BookingList(Resource):
                     "payment": {
                         "method": payment.payment_method,
                         "status": payment.payment_status,
-                        "data": payment_data
+                        "data": None
                     }
                 }
-            }, 201
+            }
+            if idempotency_key:
+                idempotency.remember(current_user_id, idempotency_key, fingerprint, response, 201)
+            
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A concurrent retry with the same key committed first
+                db.session.rollback()
+                if idempotency_key:
+                    cached = idempotency.lookup(current_user_id, idempotency_key, fingerprint)
+                    if cached:
+                        return cached
+                raise
+            
+            events.publish('booking.created', {
+                "id": booking.id,
+                "user_id": booking.user_id,
+                "service_id": booking.service_id,
+                "vehicle_id": booking.vehicle_id,
+                "date": booking.date.strftime('%Y-%m-%d'),
+                "time_from": booking.time_from.strftime('%H:%M'),
+                "time_to": booking.time_to.strftime('%H:%M'),
+                "status": booking.status
+            })
+            payment_outbox.notify(payment.id)
+            return response, 201
             
+        except idempotency.IdempotencyError as error:
+            return {"message": str(error)}, 422
         except Exception as error:
             db.session.rollback()
             return {
@@ -166,44 +226,23 @@ class BookingDetail(Resource):
         """Get booking details"""
         try:
             current_user_id = get_jwt_identity()
-            booking = Booking.query.get(booking_id)
+            row = booking_projection.booking_row(booking_id)
             
-            if not booking:
+            if not row:
                 return {"message": "Booking not found"}, 404
             
         
-            if str(booking.user_id) != current_user_id:
-                user = User.query.get(current_user_id)
-                if user.role != 'admin':
-                    return {"message": "Access denied"}, 403
+            if str(row.user_id) != current_user_id and current_role() != 'admin':
+                return {"message": "Access denied"}, 403
+            
+            etag = conditional.booking_etag(row)
+            if conditional.not_modified(etag):
+                return conditional.not_modified_response(etag)
             
             return {
                 "message": "Booking retrieved successfully",
-                "booking": {
-                    "id": str(booking.id),
-                    "service": {
-                        "id": str(booking.service.id),
-                        "name": booking.service.service_name,
-                        "price": booking.service.price
-                    },
-                    "vehicle": {
-                        "id": str(booking.vehicle.id),
-                        "name": booking.vehicle.vehicle_name,
-                        "numberplate": booking.vehicle.numberplate
-                    },
-                    "date": booking.date.strftime('%Y-%m-%d'),
-                    "time_from": booking.time_from.strftime('%H:%M'),
-                    "time_to": booking.time_to.strftime('%H:%M'),
-                    "duration": booking.duration,
-                    "total_amount": booking.total_amount,
-                    "status": booking.status,
-                    "payment": {
-                        "status": booking.payment.payment_status,
-                        "method": booking.payment.payment_method,
-                        "transaction_id": booking.payment.transaction_id
-                    } if booking.payment else None
-                }
-            }, 200
+                "booking": booking_projection.booking_detail(row)
+            }, 200, conditional.etag_headers(etag)
             
         except Exception as error:
             return {
@@ -214,140 +253,34 @@ class BookingDetail(Resource):
     @jwt_required()
     @staff_admin_required
     def put(self, booking_id):
-        try:
-            data = request.get_json()
-            if 'status' not in data:
-                return {"message": "Status is required"}, 400
-
-            booking = Booking.query.get(booking_id)
-            if not booking:
-                return {"message": "Booking not found"}, 404
-
-            
-            valid_statuses = ['confirmed', 'startservice', 'complete', 'cancelled']
-            if data['status'] not in valid_statuses:
-                return {
-                    "message": "Invalid status",
-                    "valid_statuses": valid_statuses
-                }, 400
-
-    
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-
-            if data['status'] == 'cancelled':
-                if user.role != 'admin':
-                    return {"message": "Only admin can cancel bookings"}, 403
-            
-
-            old_status = booking.status
-            booking.status = data['status']
-            
-        
-            if data['status'] == 'complete' and booking.payment:
-                booking.payment.payment_status = 'completed'
-
-            db.session.commit()
-
-            return {
-                "message": "Booking status updated successfully",
-                "booking": {
-                    "id": str(booking.id),
-                    "old_status": old_status,
-                    "new_status": booking.status,
-                    "service": {
-                        "id": str(booking.service.id),
-                        "name": booking.service.service_name
-                    },
-                    "vehicle": {
-                        "id": str(booking.vehicle.id),
-                        "numberplate": booking.vehicle.numberplate
-                    },
-                    "customer": {
-                        "id": str(booking.user.id),
-                        "username": booking.user.username
-                    },
-                    "updated_by": {
-                        "id": str(user.id),
-                        "username": user.username,
-                        "role": user.role
-                    }
-                }
-            }, 200
-
-        except Exception as error:
-            db.session.rollback()
-            return {
-                "message": "An error occurred while updating booking status",
-                "error": str(error)
-            }, 500
+        return self._update_status(booking_id)
 
     @jwt_required()
     @staff_admin_required
     def patch(self, booking_id):
-  
+        return self._update_status(booking_id)
+
+    def _update_status(self, booking_id):
         try:
             data = request.get_json()
             if 'status' not in data:
                 return {"message": "Status is required"}, 400
 
-            booking = Booking.query.get(booking_id)
-            if not booking:
-                return {"message": "Booking not found"}, 404
-
-    
-            valid_statuses = ['confirmed', 'startservice', 'complete', 'cancelled']
-            if data['status'] not in valid_statuses:
-                return {
-                    "message": "Invalid status",
-                    "valid_statuses": valid_statuses
-                }, 400
-
-    
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-
-            
-            if data['status'] == 'cancelled':
-                if user.role != 'admin':
-                    return {"message": "Only admin can cancel bookings"}, 403
-            
-            
-            old_status = booking.status
-            booking.status = data['status']
-            
-        
-            if data['status'] == 'complete' and booking.payment:
-                booking.payment.payment_status = 'completed'
-
-            db.session.commit()
+            result, error = update_status(
+                booking_id, data['status'], conditional.expected_version()
+            )
+            if error:
+                return error
 
+            user = user_cache.get(get_jwt_identity())
+            row = booking_projection.booking_row(booking_id)
             return {
                 "message": "Booking status updated successfully",
-                "booking": {
-                    "id": str(booking.id),
-                    "old_status": old_status,
-                    "new_status": booking.status,
-                    "service": {
-                        "id": str(booking.service.id),
-                        "name": booking.service.service_name
-                    },
-                    "vehicle": {
-                        "id": str(booking.vehicle.id),
-                        "numberplate": booking.vehicle.numberplate
-                    },
-                    "customer": {
-                        "id": str(booking.user.id),
-                        "username": booking.user.username
-                    },
-                    "updated_by": {
-                        "id": str(user.id),
-                        "username": user.username,
-                        "role": user.role
-                    }
-                }
-            }, 200
+                "booking": booking_projection.status_update(row, result['old_status'], user)
+            }, 200, conditional.etag_headers(conditional.booking_etag(row))
 
+        except conditional.PreconditionFailed as error:
+            return {"message": str(error)}, 412
         except Exception as error:
             db.session.rollback()
             return {
@@ -374,7 +307,16 @@ class BookingDetail(Resource):
                 return {"message": "Cannot cancel non-pending booking"}, 400
             
             booking.status = 'cancelled'
+            booking.version = Booking.version + 1
+            availability.release(booking.date, booking.vehicle.vehicle_type, booking.time_from, booking.time_to)
+            rollup.status_changes([(booking, 'pending', 'cancelled')])
             db.session.commit()
+            publish_status_changes([{
+                "result": "updated",
+                "booking_id": booking.id,
+                "old_status": 'pending',
+                "new_status": 'cancelled'
+            }])
             
             return {
                 "message": "Booking cancelled successfully"
@@ -393,78 +335,88 @@ class AllBookings(Resource):
     def get(self):
     
         try:
-            bookings = Booking.query.all()
-            
-            bookings_data = [{
-                "id": str(booking.id),
-                "user": {
-                    "id": str(booking.user.id),
-                    "username": booking.user.username
-                },
-                "service": {
-                    "id": str(booking.service.id),
-                    "name": booking.service.service_name
-                },
-                "vehicle": {
-                    "id": str(booking.vehicle.id),
-                    "numberplate": booking.vehicle.numberplate
-                },
-                "date": booking.date.strftime('%Y-%m-%d'),
-                "status": booking.status,
-                "payment_status": booking.payment.payment_status if booking.payment else "no_payment"
-            } for booking in bookings]
+            rows, next_cursor = booking_projection.booking_page(
+                booking_projection.booking_query(), request.args
+            )
+            bookings_data = [booking_projection.admin_booking(row) for row in rows]
             
             return {
                 "message": "All bookings retrieved successfully",
                 "bookings": bookings_data,
-                "total": len(bookings_data)
+                "total": len(bookings_data),
+                "next_cursor": next_cursor
             }, 200
             
+        except PaginationError as error:
+            return {"message": str(error)}, 400
         except Exception as error:
             return {
                 "message": "An error occurred while fetching bookings",
                 "error": str(error)
             }, 500
 
-class BookingStatusUpdate(Resource):
+class _Echo:
+    """File-like target that hands csv.writer output straight back"""
+    def write(self, value):
+        return value
+
+class BookingExport(Resource):
     @jwt_required()
-    @staff_admin_required
-    def post(self, booking_id, status):
+    @admin_required
+    def get(self):
+        """Stream every matching booking as NDJSON or CSV"""
         try:
-            booking = Booking.query.get(booking_id)
-            if not booking:
-                return {"message": "Booking not found"}, 404
-
-
-            valid_statuses = ['confirmed', 'startservice', 'complete', 'cancelled']
-            if status not in valid_statuses:
-                return {
-                    "message": "Invalid status",
-                    "valid_statuses": valid_statuses
-                }, 400
-
-            
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            export_format = request.args.get('format', 'ndjson')
+            if export_format not in ('ndjson', 'csv'):
+                return {"message": "format must be ndjson or csv"}, 400
 
-        
-            if status == 'cancelled' and user.role != 'admin':
-                return {"message": "Only admin can cancel bookings"}, 403
-
-    
-            old_status = booking.status
-            booking.status = status
+            query = booking_projection.filter_bookings(
+                booking_projection.booking_query(), request.args
+            )
+            rows = booking_projection.stream_rows(query)
+
+            if export_format == 'csv':
+                writer = csv.DictWriter(_Echo(), fieldnames=booking_projection.EXPORT_FIELDS)
+                def generate():
+                    yield writer.writeheader()
+                    for row in rows:
+                        yield writer.writerow(booking_projection.export_row(row))
+                mimetype = 'text/csv'
+            else:
+                def generate():
+                    for row in rows:
+                        yield json.dumps(booking_projection.export_row(row)) + '\n'
+                mimetype = 'application/x-ndjson'
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename=bookings.{export_format}'}
+            )
 
-            if status == 'complete' and booking.payment:
-                booking.payment.payment_status = 'completed'
+        except PaginationError as error:
+            return {"message": str(error)}, 400
+        except Exception as error:
+            return {
+                "message": "An error occurred while exporting bookings",
+                "error": str(error)
+            }, 500
 
-            db.session.commit()
+class BookingStatusUpdate(Resource):
+    @jwt_required()
+    @staff_admin_required
+    def post(self, booking_id, status):
+        try:
+            result, error = update_status(booking_id, status)
+            if error:
+                return error
 
+            user = user_cache.get(get_jwt_identity())
             return {
                 "message": "Booking status updated successfully",
                 "booking": {
-                    "id": str(booking.id),
-                    "old_status": old_status,
+                    "id": booking_id,
+                    "old_status": result['old_status'],
                     "new_status": status,
                     "updated_by": {
                         "username": user.username,
@@ -480,37 +432,62 @@ class BookingStatusUpdate(Resource):
                 "error": str(error)
             }, 500
 
+class BookingStatusBatch(Resource):
+    @jwt_required()
+    @staff_admin_required
+    def post(self):
+        """Apply many status changes in one transaction"""
+        try:
+            data = request.get_json()
+            items = data.get('items') if isinstance(data, dict) else data
+            if not isinstance(items, list) or not items:
+                return {"message": "A non-empty list of {booking_id, status} items is required"}, 400
+            if len(items) > booking_status.MAX_BATCH_SIZE:
+                return {"message": f"At most {booking_status.MAX_BATCH_SIZE} items per batch"}, 400
+
+            results = booking_status.apply_status_changes(items, current_role())
+            db.session.commit()
+            publish_status_changes(results)
+
+            return {
+                "message": "Booking statuses processed",
+                "results": results,
+                "updated": sum(1 for result in results if result['result'] == 'updated')
+            }, 200
+
+        except Exception as error:
+            db.session.rollback()
+            return {
+                "message": "An error occurred while updating booking statuses",
+                "error": str(error)
+            }, 500
+
 class PaymentStatus(Resource):
     @jwt_required()
     def get(self, booking_id):
         """Get payment status for a booking"""
         try:
-            booking = Booking.query.get(booking_id)
-            if not booking:
+            row = booking_projection.booking_row(booking_id)
+            if not row:
                 return {"message": "Booking not found"}, 404
 
             # Check if user owns the booking or is admin/staff
             current_user_id = get_jwt_identity()
-            if str(booking.user_id) != current_user_id:
-                user = User.query.get(current_user_id)
-                if user.role not in ['admin', 'staff']:
-                    return {"message": "Access denied"}, 403
+            if str(row.user_id) != current_user_id and current_role() not in ['admin', 'staff']:
+                return {"message": "Access denied"}, 403
 
-            if not booking.payment:
+            if not row.payment_id:
                 return {"message": "No payment found for this booking"}, 404
 
+            etag = conditional.payment_etag(row)
+            if conditional.not_modified(etag):
+                return conditional.not_modified_response(etag)
+
             return {
                 "message": "Payment status retrieved successfully",
-                "payment": {
-                    "id": booking.payment.id,
-                    "status": booking.payment.payment_status,
-                    "method": booking.payment.payment_method,
-                    "amount": booking.payment.amount,
-                    "transaction_id": booking.payment.transaction_id,
-                    "created_at": booking.payment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    "updated_at": booking.payment.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                }
-            }, 200
+                "payment": booking_projection.payment_status(
+                    row, booking_projection.payment_document(row.payment_id))
+            }, 200, conditional.etag_headers(etag)
 
         except Exception as error:
             return {
@@ -542,8 +519,24 @@ class PaymentStatus(Resource):
                     "valid_statuses": valid_statuses
                 }, 400
 
+            # Claim the payment version first so concurrent writers get 412
+            version = conditional.expected_version()
+            if version is None:
+                booking.payment.version = Payment.version + 1
+            else:
+                claimed = db.session.execute(
+                    update(Payment)
+                    .where(Payment.id == booking.payment.id, Payment.version == version)
+                    .values(version=Payment.version + 1),
+                    execution_options={"synchronize_session": False}
+                )
+                if not claimed.rowcount:
+                    db.session.rollback()
+                    return {"message": "Payment was modified by another request"}, 412
+
             # Update payment status
             booking.payment.payment_status = data['status']
+            old_status = booking.status
             
             # If payment is completed, update booking status
             if data['status'] == 'completed':
@@ -552,12 +545,22 @@ class PaymentStatus(Resource):
                 booking.status = 'pending'
             elif data['status'] == 'refunded':
                 booking.status = 'cancelled'
+            if booking.status != old_status:
+                booking.version = Booking.version + 1
+            availability.status_changed(booking, booking.vehicle.vehicle_type, old_status)
+            rollup.status_changes([(booking, old_status, booking.status)])
 
             # Add transaction ID if provided
             if 'transaction_id' in data:
                 booking.payment.transaction_id = data['transaction_id']
 
             db.session.commit()
+            events.publish('payment.status_changed', {
+                "booking_id": booking.id,
+                "payment_status": booking.payment.payment_status,
+                "old_booking_status": old_status,
+                "booking_status": booking.status
+            })
 
             return {
                 "message": "Payment status updated successfully",
@@ -570,6 +573,9 @@ class PaymentStatus(Resource):
                 }
             }, 200
 
+        except conditional.PreconditionFailed as error:
+            db.session.rollback()
+            return {"message": str(error)}, 412
         except Exception as error:
             db.session.rollback()
             return {
@@ -577,8 +583,76 @@ class PaymentStatus(Resource):
                 "error": str(error)
             }, 500
 
+class BookingStream(Resource):
+    @jwt_required()
+    @staff_admin_required
+    def get(self):
+        """Server-Sent Events feed of booking and payment changes"""
+        heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+        sequence, resumable = events.position(request.headers.get('Last-Event-ID'))
+
+        def generate():
+            nonlocal sequence
+            yield 'retry: 3000\n\n'
+            if not resumable:
+                # The client missed events we no longer hold; it must refetch
+                yield f'id: {events.event_id(sequence)}\nevent: resync\ndata: {{}}\n\n'
+            while True:
+                pending = events.wait(sequence, heartbeat)
+                if not pending:
+                    yield ': keep-alive\n\n'
+                    continue
+                for event_sequence, event_type, data in pending:
+                    sequence = event_sequence
+                    yield f'id: {events.event_id(event_sequence)}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+class Availability(Resource):
+    @jwt_required()
+    def get(self):
+        """Find the next free slots for a service"""
+        try:
+            service_id = request.args.get('service_id')
+            if not service_id:
+                return {"message": "service_id is required"}, 400
+            service = Service.query.get(service_id)
+            if not service:
+                return {"message": "Service not found"}, 404
+
+            vehicle_type = request.args.get('vehicle_type') or service.vehicle_type
+            try:
+                start_date = datetime.strptime(request.args['from'], '%Y-%m-%d').date() \
+                    if request.args.get('from') else datetime.now().date()
+                days = int(request.args.get('days', 30))
+                limit = int(request.args.get('limit', 10))
+            except ValueError:
+                return {"message": "Invalid from, days or limit"}, 400
+            if not 1 <= days <= 90 or not 1 <= limit <= 100:
+                return {"message": "days must be 1-90 and limit 1-100"}, 400
+
+            slots = availability.next_available(vehicle_type, service.duration, start_date, days, limit)
+            return {
+                "message": "Available slots retrieved successfully",
+                "slots": slots,
+                "total": len(slots)
+            }, 200
+
+        except Exception as error:
+            return {
+                "message": "An error occurred while searching availability",
+                "error": str(error)
+            }, 500
+
 api.add_resource(BookingList, '/bookings')
+api.add_resource(BookingStream, '/bookings/stream')
 api.add_resource(BookingDetail, '/bookings/<string:booking_id>')
 api.add_resource(BookingStatusUpdate, '/bookings/<string:booking_id>/status/<string:status>')
+api.add_resource(BookingStatusBatch, '/bookings/status:batch')
 api.add_resource(AllBookings, '/all-bookings')
-api.add_resource(PaymentStatus, '/bookings/<string:booking_id>/payment') 
\ No newline at end of file
+api.add_resource(BookingExport, '/all-bookings/export')
+api.add_resource(PaymentStatus, '/bookings/<string:booking_id>/payment')
+api.add_resource(Availability, '/availability') 
\ No newline at end of file
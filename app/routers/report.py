@@ -0,0 +1,86 @@
+from flask import Blueprint, request
+from flask_restful import Resource, Api
+from app.models import DailyBookingStat, Service
+from app.extensions import db
+from flask_jwt_extended import jwt_required
+from app.middleware.auth_middleware import admin_required
+from sqlalchemy import func
+from datetime import datetime, timedelta
+
+report_bp = Blueprint('report', __name__)
+api = Api(report_bp)
+
+MAX_REPORT_DAYS = 366
+
+class DailyReport(Resource):
+    @jwt_required()
+    @admin_required
+    def get(self):
+        """Daily booking volume and revenue, served from the rollup table"""
+        try:
+            group_by = request.args.get('group_by', 'service')
+            if group_by not in ('service', 'status'):
+                return {"message": "group_by must be service or status"}, 400
+
+            try:
+                date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() \
+                    if request.args.get('to') else datetime.now().date()
+                date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() \
+                    if request.args.get('from') else date_to - timedelta(days=29)
+            except ValueError:
+                return {"message": "from and to must be in YYYY-MM-DD format"}, 400
+            if date_from > date_to or (date_to - date_from).days >= MAX_REPORT_DAYS:
+                return {"message": f"Date range must be 1 to {MAX_REPORT_DAYS} days"}, 400
+
+            key = DailyBookingStat.service_id if group_by == 'service' else DailyBookingStat.status
+            query = db.session.query(
+                DailyBookingStat.date,
+                key,
+                func.sum(DailyBookingStat.count).label('count'),
+                func.sum(DailyBookingStat.revenue).label('revenue'),
+                func.sum(DailyBookingStat.total_duration).label('total_duration')
+            ).filter(
+                DailyBookingStat.date >= date_from,
+                DailyBookingStat.date <= date_to
+            )
+            if request.args.get('status'):
+                query = query.filter(DailyBookingStat.status.in_(request.args['status'].split(',')))
+            rows = query.group_by(DailyBookingStat.date, key) \
+                .order_by(DailyBookingStat.date, key).all()
+
+            names = {}
+            if group_by == 'service':
+                service_ids = {row[1] for row in rows}
+                names = dict(db.session.query(Service.id, Service.service_name)
+                             .filter(Service.id.in_(service_ids)).all()) if service_ids else {}
+
+            report = []
+            for row in rows:
+                entry = {
+                    "date": row.date.strftime('%Y-%m-%d'),
+                    "count": int(row.count),
+                    "revenue": round(float(row.revenue), 2),
+                    "total_duration": int(row.total_duration)
+                }
+                if group_by == 'service':
+                    entry["service"] = {"id": row[1], "name": names.get(row[1])}
+                else:
+                    entry["status"] = row[1]
+                report.append(entry)
+
+            return {
+                "message": "Daily report retrieved successfully",
+                "from": date_from.strftime('%Y-%m-%d'),
+                "to": date_to.strftime('%Y-%m-%d'),
+                "group_by": group_by,
+                "report": report,
+                "total": len(report)
+            }, 200
+
+        except Exception as error:
+            return {
+                "message": "An error occurred while building the report",
+                "error": str(error)
+            }, 500
+
+api.add_resource(DailyReport, '/reports/daily')
@@ -1,33 +1,73 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, Response
 from flask_restful import Resource, Api
 from app.models import Service
 from app.extensions import db
 from flask_jwt_extended import jwt_required
 from app.middleware.auth_middleware import admin_required
+from app.helper import catalog_cache
+from app.helper import conditional
+from app.helper import service_search
+from app.helper.pagination import page_size, PaginationError
+from app.response import success_response
 import uuid
 
 service_bp = Blueprint('service', __name__)
 api = Api(service_bp)
 
+SERVICE_FILTERS = ('vehicle_type', 'min_price', 'max_price', 'max_duration', 'sort')
+
+SERVICE_SORTS = {
+    'price': (Service.price, Service.id),
+    '-price': (Service.price.desc(), Service.id),
+    'duration': (Service.duration, Service.id),
+    'name': (Service.service_name, Service.id),
+}
+
+def service_key(service_id):
+    """Canonical string form of a service id; raises ValueError if malformed.
+
+    Ids are stored as String(36), so lookups compare strings and use the
+    primary key index on every backend.
+    """
+    return str(uuid.UUID(service_id))
+
+def filter_services(args):
+    """Query for the services matching the request filters."""
+    query = Service.query
+    if args.get('vehicle_type'):
+        query = query.filter(Service.vehicle_type == args['vehicle_type'])
+    if args.get('min_price'):
+        query = query.filter(Service.price >= float(args['min_price']))
+    if args.get('max_price'):
+        query = query.filter(Service.price <= float(args['max_price']))
+    if args.get('max_duration'):
+        query = query.filter(Service.duration <= int(args['max_duration']))
+    sort = args.get('sort', 'name')
+    if sort not in SERVICE_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SERVICE_SORTS)}")
+    return query.order_by(*SERVICE_SORTS[sort])
+
 class ServiceList(Resource):
     def get(self):
         try:
-            services = Service.query.all()
-            print(services)
-            services_data = [{
-                "id": str(service.id),
-                "service_name": service.service_name,
-                "description": service.description,
-                "price": service.price,
-                "duration": service.duration,
-                "vehicle_type": service.vehicle_type
-            } for service in services]
-            
-            return {
-                "message": "Services retrieved successfully",
-                "services": services_data,
-                "total": len(services_data)
-            }, 200
+            if any(request.args.get(name) for name in SERVICE_FILTERS):
+                try:
+                    services = filter_services(request.args).all()
+                except ValueError as error:
+                    return {"message": "Invalid service filter", "error": str(error)}, 400
+                services_data = [success_response.service_to_dict(service) for service in services]
+                return {
+                    "message": "Services retrieved successfully",
+                    "services": services_data,
+                    "total": len(services_data)
+                }, 200
+
+            body, etag = catalog_cache.get()
+            if conditional.not_modified(etag):
+                return conditional.not_modified_response(etag)
+
+            return Response(body, 200, mimetype='application/json',
+                            headers=conditional.etag_headers(etag))
             
         except Exception as error:
             return {
@@ -50,18 +90,12 @@ class ServiceList(Resource):
             )
             
             db.session.add(new_service)
+            catalog_cache.invalidate()
             db.session.commit()
             
             return {
                 "message": "Service created successfully",
-                "service": {
-                    "id": str(new_service.id),
-                    "service_name": new_service.service_name,
-                    "description": new_service.description,
-                    "price": new_service.price,
-                    "duration": new_service.duration,
-                    "vehicle_type": new_service.vehicle_type
-                }
+                "service": success_response.service_to_dict(new_service)
             }, 201
             
         except Exception as error:
@@ -74,22 +108,14 @@ class ServiceList(Resource):
 class ServiceDetail(Resource):
     def get(self, service_id):
         try:
-            service_uuid = uuid.UUID(service_id)
-            service = Service.query.filter_by(id=service_uuid).first()
+            service = Service.query.filter_by(id=service_key(service_id)).first()
             
             if not service:
                 return {"message": "Service not found"}, 404
             
             return {
                 "message": "Service retrieved successfully",
-                "service": {
-                    "id": str(service.id),
-                    "service_name": service.service_name,
-                    "description": service.description,
-                    "price": service.price,
-                    "duration": service.duration,
-                    "vehicle_type": service.vehicle_type
-                }
+                "service": success_response.service_to_dict(service)
             }, 200
             
         except ValueError:
@@ -104,8 +130,7 @@ class ServiceDetail(Resource):
     @admin_required
     def put(self, service_id):
         try:
-            service_uuid = uuid.UUID(service_id)
-            service = Service.query.filter_by(id=service_uuid).first()
+            service = Service.query.filter_by(id=service_key(service_id)).first()
             
             if not service:
                 return {"message": "Service not found"}, 404
@@ -124,18 +149,12 @@ class ServiceDetail(Resource):
             if "vehicle_type" in data:
                 service.vehicle_type = data["vehicle_type"]
             
+            catalog_cache.invalidate()
             db.session.commit()
             
             return {
                 "message": "Service updated successfully",
-                "service": {
-                    "id": str(service.id),
-                    "service_name": service.service_name,
-                    "description": service.description,
-                    "price": service.price,
-                    "duration": service.duration,
-                    "vehicle_type": service.vehicle_type
-                }
+                "service": success_response.service_to_dict(service)
             }, 200
             
         except ValueError:
@@ -151,13 +170,13 @@ class ServiceDetail(Resource):
     @admin_required
     def delete(self, service_id):
         try:
-            service_uuid = uuid.UUID(service_id)
-            service = Service.query.filter_by(id=service_uuid).first()
+            service = Service.query.filter_by(id=service_key(service_id)).first()
             
             if not service:
                 return {"message": "Service not found"}, 404
             
             db.session.delete(service)
+            catalog_cache.invalidate()
             db.session.commit()
             
             return {
@@ -173,6 +192,35 @@ class ServiceDetail(Resource):
                 "error": str(error)
             }, 500
 
+class ServiceSearch(Resource):
+    def get(self):
+        """Ranked full-text search over service names and descriptions"""
+        try:
+            q = request.args.get('q', '').strip()
+            if not q:
+                return {"message": "q is required"}, 400
+            try:
+                limit = page_size(request.args)
+            except PaginationError as error:
+                return {"message": str(error)}, 400
+
+            services = service_search.search(q, limit)
+            services_data = [success_response.service_to_dict(service) for service in services]
+            return {
+                "message": "Services retrieved successfully",
+                "services": services_data,
+                "total": len(services_data)
+            }, 200
+
+        except service_search.SearchUnavailable as error:
+            return {"message": str(error)}, 501
+        except Exception as error:
+            return {
+                "message": "An error occurred while searching services",
+                "error": str(error)
+            }, 500
+
 # Register routes
 api.add_resource(ServiceList, '/services')
+api.add_resource(ServiceSearch, '/services/search')
 api.add_resource(ServiceDetail, '/services/<string:service_id>') 
\ No newline at end of file
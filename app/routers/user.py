@@ -1,16 +1,42 @@
 from flask import Blueprint, request, current_app
 from flask_restful import Resource, Api
 from app.models import User
-from app.extensions import db
+from app.extensions import db, user_cache
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.middleware.auth_middleware import admin_required
 from app.helper.cloudinary_helper import upload_image, delete_image
 import uuid
 from app.response import success_response,server_response
+from app.helper.pagination import (
+    PaginationError, page_size, encode_cursor, decode_cursor, paginate
+)
+from app.helper.filters import prefix_filter
+from sqlalchemy import or_
 
 user_bp = Blueprint('user', __name__)
 api = Api(user_bp)
 
+USER_FIELDS = {
+    'id': User.id,
+    'profile_image': User.profile_image,
+    'username': User.username,
+    'phonenumber': User.phonenumber,
+    'role': User.role,
+}
+
+USER_ORDER = (User.username, User.id)
+
+def requested_fields(args):
+    """Fields named by ``fields=a,b``; all of them when absent."""
+    if not args.get('fields'):
+        return list(USER_FIELDS)
+    fields = [name.strip() for name in args['fields'].split(',') if name.strip()]
+    unknown = [name for name in fields if name not in USER_FIELDS]
+    if unknown or not fields:
+        raise PaginationError(f"fields must be drawn from {', '.join(USER_FIELDS)}")
+    return fields
+
+
 class UserProfile(Resource):
     @jwt_required()
     def get(self):
@@ -44,6 +70,7 @@ class UserProfile(Resource):
                     setattr(user, field, data[field])
                     
             db.session.commit()
+            user_cache.invalidate(user.id)
             
             return success_response.userdata(user), 200
             
@@ -56,11 +83,31 @@ class UserList(Resource):
     @admin_required
     def get(self):
         try:
-            users = User.query.all()
-            users_data = [success_response.user_to_dict(user) for user in users]
-            
-            return success_response.user_all(users_data), 200
+            fields = requested_fields(request.args)
+            limit = page_size(request.args)
+            after = decode_cursor(request.args.get('cursor'), len(USER_ORDER))
+
+            # Only the requested columns (plus the sort key) are selected
+            selected = fields + [name for name in ('username', 'id') if name not in fields]
+            query = db.session.query(*[USER_FIELDS[name] for name in selected])
+            if request.args.get('q'):
+                q = request.args['q']
+                query = query.filter(or_(
+                    prefix_filter(User.username, q),
+                    prefix_filter(User.phonenumber, q)
+                ))
+
+            rows, has_more = paginate(query, USER_ORDER, after, limit)
+            users_data = [{name: getattr(row, name) for name in fields} for row in rows]
+
+            response = success_response.user_all(users_data)
+            response['next_cursor'] = encode_cursor(
+                [rows[-1].username, rows[-1].id]
+            ) if has_more else None
+            return response, 200
             
+        except PaginationError as error:
+            return {"message": str(error)}, 400
         except Exception as error:
             return server_response.data_error(error), 500
 
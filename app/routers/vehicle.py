@@ -1,23 +1,43 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, Response, stream_with_context
 from flask_restful import Resource, Api
-from app.models import Vehicle, User
+from app.models import Vehicle
 from app.extensions import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.middleware.auth_middleware import user_admin_required
-import uuid
+from app.middleware.auth_middleware import admin_required, staff_admin_required
 from app.response import success_response,server_response
 from app.helper.body_validator import vechile_validation
+from app.helper.pagination import PaginationError, page_size, encode_cursor, decode_cursor, paginate
+from app.helper.filters import prefix_filter
+from app.helper.json_stream import stream_object
+from app.helper import numberplate
 
 vehicle_bp = Blueprint('vehicle', __name__)
 api = Api(vehicle_bp)
 
+VEHICLE_COLUMNS = (
+    Vehicle.id, Vehicle.vehicle_image, Vehicle.vehicle_name, Vehicle.vehicle_model,
+    Vehicle.numberplate, Vehicle.vehicle_type, Vehicle.user_id
+)
+
+STREAM_BATCH_SIZE = 500
+
+def json_stream(chunks):
+    return Response(stream_with_context(chunks), mimetype='application/json')
+
 class VehicleList(Resource):
     @jwt_required()
     def get(self):
+        """The caller's own vehicles"""
         try:
-            vehicles = Vehicle.query.all()
-            vehicles_data = [success_response.vechile_list(vehicle) for vehicle in vehicles]
-            return success_response.vechile_response(vehicles_data), 200
+            rows = db.session.query(*VEHICLE_COLUMNS) \
+                .filter(Vehicle.user_id == get_jwt_identity()) \
+                .order_by(Vehicle.id) \
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            return json_stream(stream_object(
+                {"message": "Vechile listed successfully"}, "users",
+                (success_response.vechile_list(row) for row in rows),
+                lambda count: {"total": count}
+            ))
             
         except Exception as error:
             return server_response.data_error(error), 500
@@ -77,7 +97,9 @@ class VehicleDetail(Resource):
             if "vehicle_model" in data:
                 vehicle.vehicle_model = data["vehicle_model"]
             if "numberplate" in data:
-                existing = Vehicle.query.filter_by(numberplate=data["numberplate"]).first()
+                if not numberplate.normalize(data["numberplate"]):
+                    return {"message": "Invalid numberplate"}, 400
+                existing = numberplate.find(data["numberplate"])
                 if existing and existing.id != vehicle.id:
                     return {"message": "Vehicle with this numberplate already exists"}, 400
                 vehicle.numberplate = data["numberplate"]
@@ -111,28 +133,50 @@ class VehicleDetail(Resource):
             db.session.rollback()
             return server_response.data_error(error), 500
 
+class VehicleByPlate(Resource):
+    @jwt_required()
+    @staff_admin_required
+    def get(self, plate):
+        """Resolve a scanned or typed plate, ignoring case, spaces and dashes"""
+        try:
+            vehicle = numberplate.find(plate)
+            if not vehicle:
+                return {"message": "Vehicle not found"}, 404
+
+            response = success_response.vechile_details(vehicle)
+            response["vehicle"]["user_id"] = vehicle.user_id
+            return response, 200
+
+        except Exception as error:
+            return server_response.data_error(error), 500
+
 class AllVehicles(Resource):
     @jwt_required()
-    @user_admin_required
+    @admin_required
     def get(self):
+        """One page of vehicles, filtered by vehicle_type, user_id or numberplate prefix"""
         try:
-            vehicles = Vehicle.query.all()
-            vehicles_data = [{
-                "id": str(vehicle.id),
-                "vehicle_name": vehicle.vehicle_name,
-                "vehicle_model": vehicle.vehicle_model,
-                "numberplate": vehicle.numberplate,
-                "vehicle_type": vehicle.vehicle_type,
-                "vehicle_image": vehicle.vehicle_image,
-                "user_id": str(vehicle.user_id)
-            } for vehicle in vehicles]
-            
+            limit = page_size(request.args)
+            after = decode_cursor(request.args.get('cursor'), 1)
+
+            query = db.session.query(*VEHICLE_COLUMNS)
+            if request.args.get('vehicle_type'):
+                query = query.filter(Vehicle.vehicle_type == request.args['vehicle_type'])
+            if request.args.get('user_id'):
+                query = query.filter(Vehicle.user_id == request.args['user_id'])
+            if request.args.get('numberplate'):
+                query = query.filter(prefix_filter(Vehicle.numberplate, request.args['numberplate']))
+            rows, has_more = paginate(query, (Vehicle.id,), after, limit)
+
             return {
                 "message": "All vehicles retrieved successfully",
-                "vehicles": vehicles_data,
-                "total": len(vehicles_data)
+                "vehicles": [success_response.vechile_list(row) for row in rows],
+                "total": len(rows),
+                "next_cursor": encode_cursor([rows[-1].id]) if has_more else None
             }, 200
-            
+
+        except PaginationError as error:
+            return {"message": str(error)}, 400
         except Exception as error:
             return {
                 "message": "An error occurred while fetching vehicles",
@@ -142,4 +186,5 @@ class AllVehicles(Resource):
 
 api.add_resource(VehicleList, '/vehicles')  
 api.add_resource(VehicleDetail, '/vehicles/<string:vehicle_id>') 
+api.add_resource(VehicleByPlate, '/vehicles/by-plate/<string:plate>')
 api.add_resource(AllVehicles, '/all-vehicles')  
\ No newline at end of file
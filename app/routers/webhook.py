@@ -0,0 +1,45 @@
+from flask import Blueprint, request, current_app
+from flask_restful import Resource, Api
+from app.extensions import webhook_batcher
+from app.helper import webhooks
+from app.response import server_response
+from concurrent.futures import TimeoutError as ApplyTimeout
+from collections import Counter
+import json
+
+webhook_bp = Blueprint('webhook', __name__)
+api = Api(webhook_bp)
+
+class WebhookReceiver(Resource):
+    def post(self, gateway):
+        """Payment status notifications from a gateway, verified by signature"""
+        body = request.get_data()
+        try:
+            webhooks.verify(gateway, body, request.headers,
+                            tolerance=current_app.config.get('WEBHOOK_TOLERANCE_SECONDS', 300))
+        except webhooks.UnknownGateway as error:
+            return {"message": "Unknown payment gateway", "error": str(error)}, 404
+        except webhooks.SignatureError as error:
+            return {"message": "Invalid webhook signature", "error": str(error)}, 400
+
+        try:
+            payload = json.loads(body)
+        except ValueError as error:
+            return {"message": "Webhook body must be JSON", "error": str(error)}, 400
+
+        try:
+            items = webhooks.parse(gateway, payload)
+            webhooks.archive(gateway, request.headers, body)
+            results = webhook_batcher.submit(items)
+        except ApplyTimeout as error:
+            # Not committed yet; the gateway's retry is deduplicated
+            return server_response.busy_error(error), 503, {'Retry-After': '5'}
+        except Exception as error:
+            return server_response.unexcept_error(error), 500
+
+        return {
+            "message": "Webhook received",
+            "events": dict(Counter(results))
+        }, 200
+
+api.add_resource(WebhookReceiver, '/webhooks/<string:gateway>')
@@ -0,0 +1,66 @@
+"""Gateway calls per second with pooled keep-alive sessions vs a new
+connection per call, against the local mock gateway.
+
+    python benchmarks/bench_gateway.py --latency 50 --clients 16 --calls 400
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_gateway import serve
+from app import create_app
+from app.helper.payment_helper import initialize_payment
+from config import TestConfig
+
+
+def run(clients, calls, call):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(call, range(calls)))
+    elapsed = time.perf_counter() - started
+    return calls / elapsed, sum(1 for result in results if not result.get('success'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=50, help='mock gateway latency in ms')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--calls', type=int, default=400)
+    args = parser.parse_args()
+
+    server = serve(latency=args.latency, failure_rate=args.failure_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class BenchConfig(TestConfig):
+        PAYMENT_GATEWAY_URL = url
+        PAYMENT_GATEWAY_POOL_SIZE = args.clients
+
+    app = create_app(BenchConfig)
+
+    def pooled(_):
+        with app.app_context():
+            return initialize_payment('stripe', 10.0)
+
+    def unpooled(_):
+        try:
+            return requests.post(f"{url}/stripe/payments", json={'amount': 10.0},
+                                 headers={'Connection': 'close'}, timeout=(3, 10)).json()
+        except requests.RequestException as error:
+            return {'success': False, 'error': str(error)}
+
+    print(f"{args.calls} calls, {args.clients} clients, {args.latency:.0f} ms gateway latency")
+    for name, call in (('new connection per call', unpooled), ('pooled keep-alive', pooled)):
+        rate, failed = run(args.clients, args.calls, call)
+        print(f"  {name:<24} {rate:8.1f} calls/s  {failed} failed")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
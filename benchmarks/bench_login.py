@@ -0,0 +1,72 @@
+"""Logins per second through POST /login at different hashing pool sizes.
+
+    python benchmarks/bench_login.py --workers 0 1 2 4 --clients 16 --logins 200
+
+Each run uses a fresh SQLite file; clients are threads sharing the app, as
+under a threaded server.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db, password_hasher
+from app.models import User
+from app.helper.auth_helper import password_hash
+from config import Config
+
+
+def run(workers, clients, logins, queue_limit):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        PASSWORD_HASH_WORKERS = workers
+        PASSWORD_HASH_QUEUE_LIMIT = queue_limit
+        # Every login is one user from one address; keep the limiter out of the measurement
+        RATE_LIMITS = {name: (logins, 60) for name in Config.RATE_LIMITS}
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.session.add(User(username='bench', phonenumber='0000000000',
+                            password=password_hash('bench123'), role='user'))
+        db.session.commit()
+
+    def login(_):
+        with app.test_client() as client:
+            return client.post('/login', json={"username": "bench", "password": "bench123"}).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        statuses = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    password_hasher.shutdown()
+    os.remove(path)
+    assert statuses.count(200) == logins, f"Not every login succeeded: {Counter(statuses)}"
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--queue-limit', type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'logins/s':>10}")
+    for workers in args.workers:
+        rate = run(workers, args.clients, args.logins, args.queue_limit)
+        print(f"{workers:>8} {rate:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
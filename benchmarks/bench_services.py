@@ -0,0 +1,94 @@
+"""Filtered service listing and detail lookups against a 10k-service catalog.
+
+    python benchmarks/bench_services.py --services 10000 --requests 200
+
+Prints the mean latency of each request and the SQLite query plan the
+filter and detail lookups use.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app import create_app
+from app.extensions import db
+from app.models import Service
+from config import Config
+
+VEHICLE_TYPES = ['car', 'bike', 'suv', 'van', 'truck']
+
+
+def seed(count):
+    rng = random.Random(42)
+    db.session.bulk_insert_mappings(Service, [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "service_name": f"Service {i}",
+        "description": "Benchmark service",
+        "price": round(rng.uniform(5, 500), 2),
+        "duration": rng.choice([15, 30, 45, 60, 90, 120]),
+        "vehicle_type": rng.choice(VEHICLE_TYPES)
+    } for i in range(count)])
+    db.session.commit()
+    return [service_id for (service_id,) in db.session.query(Service.id)]
+
+
+def timed(client, urls):
+    started = time.perf_counter()
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return (time.perf_counter() - started) / len(urls) * 1000
+
+
+def plan(sql, **params):
+    rows = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+    return '; '.join(row[-1] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        PASSWORD_HASH_WORKERS = 0
+
+    app = create_app(BenchConfig)
+    try:
+        with app.app_context():
+            ids = seed(args.services)
+            client = app.test_client()
+            rng = random.Random(7)
+
+            filtered = [
+                f"/services?vehicle_type={rng.choice(VEHICLE_TYPES)}"
+                f"&min_price={low}&max_price={low + 50}&sort=price"
+                for low in (rng.randrange(5, 450) for _ in range(args.requests))
+            ]
+            details = [f"/services/{rng.choice(ids)}" for _ in range(args.requests)]
+
+            print(f"{args.services} services, {args.requests} requests each")
+            print(f"  filtered list   {timed(client, filtered):8.2f} ms/request")
+            print(f"  full catalog    {timed(client, ['/services'] * args.requests):8.2f} ms/request (cached)")
+            print(f"  service detail  {timed(client, details):8.2f} ms/request")
+            print("  filter plan:", plan(
+                "SELECT * FROM service WHERE vehicle_type = :t AND price BETWEEN :a AND :b ORDER BY price, id",
+                t='car', a=10, b=60))
+            print("  detail plan:", plan("SELECT * FROM service WHERE id = :id", id=ids[0]))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
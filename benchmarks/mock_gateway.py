@@ -0,0 +1,72 @@
+"""Local stand-in for the payment gateways' HTTP APIs.
+
+    python benchmarks/mock_gateway.py --port 8099 --latency 120 --failure-rate 0.05
+
+POST /<gateway>/payments answers after ``--latency`` ms with a created
+payment, or a 503 for ``--failure-rate`` of calls. Point the app at it with
+PAYMENT_GATEWAY_URL=http://127.0.0.1:8099.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+
+def make_handler(latency, failure_rate):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections open between requests
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            parts = self.path.strip('/').split('/')
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            time.sleep(latency / 1000)
+            if len(parts) != 2 or parts[1] != 'payments':
+                return self._reply(404, {'success': False, 'error': 'Unknown endpoint'})
+            if random.random() < failure_rate:
+                return self._reply(503, {'success': False, 'error': 'Gateway overloaded'})
+            self._reply(200, {
+                'success': True,
+                'payment_id': f'{parts[0]}_{uuid.uuid4().hex[:12]}',
+                'amount': payload.get('amount'),
+                'status': 'created'
+            })
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=0, latency=0, failure_rate=0.0):
+    """Start the mock in a background thread; returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency, failure_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds per call')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.latency, args.failure_rate))
+    print(f"Mock gateway on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,87 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Password hashing: werkzeug method string, process pool size (0 hashes
+    # on the request thread) and how many hashes may wait before 503s
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', '16'))
+    PASSWORD_HASH_TIMEOUT = 30
+    
+    # Throttles as (requests, window seconds), keyed by client IP or username
+    RATE_LIMITS = {
+        'login:ip': (30, 60),
+        'login:username': (10, 60),
+        'signup:ip': (10, 3600),
+    }
+    RATE_LIMIT_MAX_KEYS = 100000
+    
+    # How stale another worker's service catalog edit may look on GET /services
+    CATALOG_CHECK_SECONDS = 5
+    
+    # Wash bays: how many bookings of a vehicle type may overlap
+    BAY_CAPACITY = {'car': 2}
+    DEFAULT_BAY_CAPACITY = int(os.getenv('DEFAULT_BAY_CAPACITY', '1'))
+    
+    # Business hours searched by /availability
+    OPENING_TIME = os.getenv('OPENING_TIME', '08:00')
+    CLOSING_TIME = os.getenv('CLOSING_TIME', '20:00')
+    
+    # How long a booking Idempotency-Key replays its first response
+    IDEMPOTENCY_TTL = timedelta(hours=24)
+    
+    # Per-process cache of users for role checks
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60
+    
+    # Revoked tokens: Bloom filter sizing and how often workers resync it
+    REVOCATION_BLOOM_CAPACITY = 100000
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    REVOCATION_SYNC_SECONDS = 5
+    REVOCATION_REBUILD_SECONDS = 3600
+    
+    # Booking change feed (/bookings/stream)
+    EVENT_BUFFER_SIZE = 1000
+    SSE_HEARTBEAT_SECONDS = 15
+    
+    # Payment initialisation outbox: 'sdk' calls the gateways, 'stub' is an
+    # offline stand-in. Failed attempts back off exponentially.
+    PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'sdk')
+    PAYMENT_OUTBOX_WORKERS = int(os.getenv('PAYMENT_OUTBOX_WORKERS', '4'))
+    PAYMENT_OUTBOX_MAX_ATTEMPTS = 5
+    PAYMENT_OUTBOX_BACKOFF_SECONDS = 2
+    PAYMENT_OUTBOX_MAX_BACKOFF_SECONDS = 300
+    PAYMENT_OUTBOX_LEASE_SECONDS = 60
+    PAYMENT_OUTBOX_POLL_SECONDS = 5
+    
+    # Gateway clients: pooled keep-alive sessions, per-call time budgets in
+    # seconds and a circuit breaker per gateway. PAYMENT_GATEWAY_URL sends
+    # calls to an HTTP gateway instead of the SDKs (see benchmarks/mock_gateway.py)
+    PAYMENT_GATEWAY_URL = os.getenv('PAYMENT_GATEWAY_URL')
+    PAYMENT_GATEWAY_TIMEOUTS = {'stripe': 10, 'razorpay': 10, 'paypal': 15}
+    PAYMENT_GATEWAY_CONNECT_TIMEOUT = 3
+    PAYMENT_GATEWAY_POOL_SIZE = 10
+    PAYMENT_GATEWAY_FAILURE_THRESHOLD = 5
+    PAYMENT_GATEWAY_RESET_SECONDS = 30
+    
+    # Gateway webhooks (/webhooks/<gateway>): HMAC secrets per gateway, the
+    # group-commit batch (1 applies each delivery inline) and an optional
+    # directory of raw deliveries for 'flask replay-webhooks'
+    WEBHOOK_SECRETS = {
+        'stripe': os.getenv('STRIPE_WEBHOOK_SECRET'),
+        'razorpay': os.getenv('RAZORPAY_WEBHOOK_SECRET'),
+    }
+    WEBHOOK_TOLERANCE_SECONDS = 300
+    WEBHOOK_BATCH_SIZE = 200
+    WEBHOOK_BATCH_WAIT_MS = 20
+    WEBHOOK_APPLY_TIMEOUT_SECONDS = 10
+    WEBHOOK_ARCHIVE_DIR = os.getenv('WEBHOOK_ARCHIVE_DIR')
+    
+    # 'flask reconcile': settlement report rows per chunk and the processes
+    # checking chunks (0 checks them in the command's own process)
+    RECONCILE_CHUNK_SIZE = 5000
+    RECONCILE_WORKERS = os.cpu_count() or 1
+    
     # Payment Gateway Keys
     STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
     STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY')
@@ -41,4 +122,15 @@ class Config:
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # One process: revocations reach the Bloom filter directly, no resync needed
+    REVOCATION_SYNC_SECONDS = 3600
+    PASSWORD_HASH_WORKERS = 0
+    PAYMENT_GATEWAY = 'stub'
+    PAYMENT_OUTBOX_WORKERS = 0
+    PAYMENT_OUTBOX_BACKOFF_SECONDS = 0
+    WEBHOOK_SECRETS = {'stripe': 'whsec_test', 'razorpay': 'rzp_test'}
+    WEBHOOK_BATCH_SIZE = 1
+    RECONCILE_WORKERS = 0
+    # Every test client shares one IP
+    RATE_LIMITS = {**Config.RATE_LIMITS, 'login:ip': (1000, 60), 'signup:ip': (1000, 60)}
     
\ No newline at end of file
@@ -1,9 +1,17 @@
 import unittest
 import json
 from app import create_app
-from app.extensions import db
+from app.extensions import db, user_cache, password_hasher, revocations
 from app.models import User
+from app.helper.auth_helper import password_hash
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from contextlib import contextmanager
+from unittest import mock
 from tests.config import TestConfig
+import config
+import threading
+import uuid
 
 class AuthTestCase(unittest.TestCase):
     def setUp(self):
@@ -164,5 +172,152 @@ class AuthTestCase(unittest.TestCase):
         response = self.client.get('/protected')
         self.assertEqual(response.status_code, 401)
 
+
+class TokenTestCase(unittest.TestCase):
+    """Token and login checks, on the in-memory test configuration"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(config.TestConfig)
+        cls.client = cls.app.test_client()
+
+        cls.app_context = cls.app.app_context()
+        cls.app_context.push()
+
+        db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.app_context.pop()
+
+    def create_user(self, role, password):
+        """Insert a user directly and return its username"""
+        username = f"{role}_{uuid.uuid4().hex[:8]}"
+        db.session.add(User(username=username, password=password_hash(password),
+                            phonenumber="1234567890", role=role))
+        db.session.commit()
+        return username
+
+    def get_token(self, username, password):
+        response = self.client.post('/login', json={"username": username, "password": password})
+        return response.json['accessToken']
+
+    @contextmanager
+    def count_queries(self):
+        """Count SQL statements issued while the block runs"""
+        statements = []
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    def test_role_checks_use_token_claims(self):
+        """Test role decorators read the token instead of the user table"""
+        admin_username = self.create_user("admin", "admin123")
+        admin_token = self.get_token(admin_username, "admin123")
+        user_token = self.get_token(self.create_user("user", "user123"), "user123")
+
+        with self.count_queries() as statements:
+            response = self.client.get('/all-bookings',
+                headers={"Authorization": f"Bearer {admin_token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('FROM user' in s for s in statements))
+
+        response = self.client.get('/all-bookings',
+            headers={"Authorization": f"Bearer {user_token}"})
+        self.assertEqual(response.status_code, 403)
+
+        # Tokens without a role claim are resolved once, then cached
+        user_cache.clear()
+        with self.app.app_context():
+            admin_id = User.query.filter_by(username=admin_username).first().id
+            legacy_token = create_access_token(identity=admin_id)
+        for expected in (1, 0):
+            with self.count_queries() as statements:
+                response = self.client.get('/all-bookings',
+                    headers={"Authorization": f"Bearer {legacy_token}"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sum('FROM user' in s for s in statements), expected)
+
+    def test_logout_revokes_token(self):
+        """Test revoked tokens are rejected and live ones skip the database"""
+        username = self.create_user("user", "user123")
+        token = self.get_token(username, "user123")
+        other = self.get_token(username, "user123")
+
+        response = self.client.post('/logout', headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/bookings', headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['error'], 'token_revoked')
+
+        with self.count_queries() as statements:
+            response = self.client.get('/protected', headers={"Authorization": f"Bearer {other}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(statements, [])
+
+        # A filter that can't be built falls back to the table
+        revocations._reset()
+        try:
+            with mock.patch.object(revocations.store, 'revoked_since', side_effect=RuntimeError("sync failed")):
+                response = self.client.get('/bookings', headers={"Authorization": f"Bearer {token}"})
+                self.assertEqual(response.status_code, 401)
+                response = self.client.get('/protected', headers={"Authorization": f"Bearer {other}"})
+                self.assertEqual(response.status_code, 200)
+        finally:
+            revocations._reset()
+
+    def test_login_rehashes_and_sheds_load(self):
+        """Test logins upgrade stale hashes and fail fast when hashing is saturated"""
+        username = self.create_user("user", "user123")
+        method = password_hasher.method
+        password_hasher.method = 'pbkdf2:sha256:1000'
+        try:
+            self.get_token(username, "user123")
+            with self.app.app_context():
+                stored = User.query.filter_by(username=username).first().password
+            self.assertTrue(stored.startswith('pbkdf2:sha256:1000$'))
+            self.get_token(username, "user123")
+            # Short method names are expanded by Werkzeug; fresh hashes still match
+            password_hasher.method = 'pbkdf2:sha256'
+            self.assertFalse(password_hasher.needs_rehash(password_hasher.hash("user123")))
+            password_hasher.method = 'scrypt'
+            self.assertFalse(password_hasher.needs_rehash(password_hasher.hash("user123")))
+            self.assertTrue(password_hasher.needs_rehash(stored))
+        finally:
+            password_hasher.method = method
+
+        workers, slots = password_hasher.workers, password_hasher._slots
+        password_hasher.workers, password_hasher._slots = 1, threading.BoundedSemaphore(1)
+        password_hasher._slots.acquire()
+        try:
+            response = self.client.post('/login',
+                json={"username": username, "password": "user123"})
+        finally:
+            password_hasher.workers, password_hasher._slots = workers, slots
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_login_rate_limited_per_username(self):
+        """Test repeated logins for one username are throttled with Retry-After"""
+        username = f"ghost_{uuid.uuid4().hex[:8]}"
+        limit, window = self.app.config['RATE_LIMITS']['login:username']
+        for _ in range(limit):
+            response = self.client.post('/login', json={"username": username, "password": "x"})
+            self.assertEqual(response.status_code, 401)
+
+        response = self.client.post('/login', json={"username": username.upper(), "password": "x"})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response.headers['Retry-After']) <= window)
+
+        # Other usernames are unaffected
+        self.assertTrue(self.get_token(self.create_user("user", "user123"), "user123"))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,824 @@
+import unittest
+import json
+from app import create_app, db
+from app.extensions import events, payment_outbox, gateway_clients, webhook_batcher
+from app.helper.payment_helper import initialize_payment
+from app.models import User, Service, Vehicle, Booking, Payment, SlotMap, IdempotencyKey, DailyBookingStat, RevokedToken, CacheVersion, PaymentOutbox
+from app.helper.auth_helper import password_hash
+from app.helper import rollup
+from app.helper import webhooks
+from app.helper import reconcile
+from app.helper import compressed_json
+from app.helper import conditional
+from app.helper import slot_helper
+from config import TestConfig
+from sqlalchemy import event, text
+from contextlib import contextmanager
+from unittest import mock
+import csv
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+import time as clock
+import uuid
+from datetime import date, time, timedelta
+
+class BookingTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(TestConfig)
+        cls.client = cls.app.test_client()
+
+        # Create application context
+        cls.app_context = cls.app.app_context()
+        cls.app_context.push()
+
+        db.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.app_context.pop()
+
+    def setUp(self):
+        unique_id = uuid.uuid4().hex[:8]
+
+        admin = User(
+            username=f"admin_{unique_id}",
+            password=password_hash("admin123"),
+            phonenumber="1234567890",
+            role="admin"
+        )
+        user = User(
+            username=f"user_{unique_id}",
+            password=password_hash("user123"),
+            phonenumber="1122334455",
+            role="user"
+        )
+        db.session.add_all([admin, user])
+        db.session.commit()
+
+        service = Service(
+            service_name="Test Service",
+            description="Test Description",
+            price=99.99,
+            duration=60,
+            vehicle_type="car"
+        )
+        vehicle = Vehicle(
+            vehicle_name="Test Car",
+            vehicle_model="Test Model",
+            numberplate=f"TEST{unique_id}",
+            vehicle_type="car",
+            user_id=user.id
+        )
+        db.session.add_all([service, vehicle])
+        db.session.commit()
+
+        self.admin_username = admin.username
+        self.user_username = user.username
+        self.user_id = user.id
+        self.service_id = service.id
+        self.vehicle_id = vehicle.id
+
+    def tearDown(self):
+        db.session.query(CacheVersion).delete()
+        db.session.query(RevokedToken).delete()
+        db.session.query(DailyBookingStat).delete()
+        db.session.query(IdempotencyKey).delete()
+        db.session.query(SlotMap).delete()
+        db.session.query(PaymentOutbox).delete()
+        db.session.query(Payment).delete()
+        db.session.query(Booking).delete()
+        db.session.query(Vehicle).delete()
+        db.session.query(Service).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+
+    def get_token(self, username, password):
+        """Helper method to get auth token"""
+        response = self.client.post('/login',
+            json={
+                "username": username,
+                "password": password
+            }
+        )
+        return json.loads(response.data)['accessToken']
+
+    def create_bookings(self, count, start=None):
+        """Insert ``count`` bookings on consecutive days"""
+        start = start or date.today()
+        bookings = []
+        for offset in range(count):
+            booking = Booking(
+                user_id=self.user_id,
+                service_id=self.service_id,
+                vehicle_id=self.vehicle_id,
+                date=start + timedelta(days=offset),
+                time_from=time(10, 0),
+                time_to=time(11, 0),
+                duration=60,
+                total_amount=99.99,
+                status='pending'
+            )
+            bookings.append(booking)
+        db.session.add_all(bookings)
+        db.session.commit()
+        return bookings
+
+    def add_payments(self, bookings):
+        for booking in bookings:
+            db.session.add(Payment(
+                booking_id=booking.id,
+                amount=booking.total_amount,
+                payment_method='stripe',
+                payment_status='done'
+            ))
+        db.session.commit()
+
+    def add_vehicle(self):
+        vehicle = Vehicle(
+            vehicle_name="Second Car",
+            vehicle_model="Test Model",
+            numberplate=f"TEST{uuid.uuid4().hex[:8]}",
+            vehicle_type="car",
+            user_id=self.user_id
+        )
+        db.session.add(vehicle)
+        db.session.commit()
+        return vehicle.id
+
+    def post_booking(self, token, time_from, vehicle_id=None, headers=None, **extra):
+        booking_data = {
+            "service_id": self.service_id,
+            "vehicle_id": vehicle_id or self.vehicle_id,
+            "date": date.today().isoformat(),
+            "time_from": time_from,
+            "payment_method": "stripe"
+        }
+        booking_data.update(extra)
+        return self.client.post('/bookings',
+            headers={"Authorization": f"Bearer {token}", **(headers or {})},
+            json=booking_data
+        )
+
+    @contextmanager
+    def count_queries(self):
+        """Count SQL statements issued while the block runs"""
+        statements = []
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+    def test_bookings_cursor_pagination(self):
+        """Test walking user bookings page by page with next_cursor"""
+        self.create_bookings(5)
+        token = self.get_token(self.user_username, "user123")
+
+        seen = []
+        cursor = None
+        while True:
+            url = '/bookings?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            response = self.client.get(url,
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertLessEqual(len(data['bookings']), 2)
+            seen.extend(booking['date'] for booking in data['bookings'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_all_bookings_filters(self):
+        """Test admin booking list filtering by status and date range"""
+        bookings = self.create_bookings(4)
+        bookings[0].status = 'confirmed'
+        db.session.commit()
+        token = self.get_token(self.admin_username, "admin123")
+
+        response = self.client.get('/all-bookings?status=pending',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['total'], 3)
+        self.assertIsNone(data['next_cursor'])
+
+        date_from = (date.today() + timedelta(days=1)).isoformat()
+        date_to = (date.today() + timedelta(days=2)).isoformat()
+        response = self.client.get(f'/all-bookings?date_from={date_from}&date_to={date_to}',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        data = json.loads(response.data)
+        self.assertEqual([b['date'] for b in data['bookings']], [date_from, date_to])
+
+    def test_bookings_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        token = self.get_token(self.user_username, "user123")
+        response = self.client.get('/bookings?cursor=not-a-cursor',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_booking_endpoints_constant_queries(self):
+        """Test booking reads issue the same number of queries for 1 or 6 bookings"""
+        user_token = self.get_token(self.user_username, "user123")
+        admin_token = self.get_token(self.admin_username, "admin123")
+
+        def query_counts():
+            booking_id = Booking.query.first().id
+            db.session.remove()
+            counts = []
+            for url, token in [
+                ('/bookings', user_token),
+                ('/all-bookings', admin_token),
+                (f'/bookings/{booking_id}', admin_token),
+                (f'/bookings/{booking_id}/payment', user_token),
+            ]:
+                with self.count_queries() as statements:
+                    response = self.client.get(url,
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(statements))
+            return counts
+
+        self.add_payments(self.create_bookings(1))
+        single = query_counts()
+        self.add_payments(self.create_bookings(5, start=date.today() + timedelta(days=1)))
+        many = query_counts()
+
+        self.assertEqual(single, many)
+        self.assertTrue(all(count <= 2 for count in many))
+
+    def test_booking_handlers_use_token_claims(self):
+        """Test booking handlers that check the role themselves skip the user table"""
+        admin_token = self.get_token(self.admin_username, "admin123")
+        booking_id = self.create_bookings(1)[0].id
+        db.session.remove()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        with self.count_queries() as statements:
+            self.assertEqual(self.client.get(f'/bookings/{booking_id}', headers=headers).status_code, 200)
+            self.assertEqual(self.client.get(f'/bookings/{booking_id}/payment', headers=headers).status_code, 404)
+            response = self.client.post('/bookings/status:batch', headers=headers,
+                json=[{"booking_id": booking_id, "status": "confirmed"}])
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('FROM user' in s for s in statements))
+        response = self.client.post(f'/bookings/{booking_id}/status/startservice', headers=headers)
+        self.assertEqual(json.loads(response.data)['booking']['updated_by'],
+                         {"username": self.admin_username, "role": "admin"})
+
+    def test_payment_initialised_through_outbox(self):
+        """Test the gateway runs after commit and failed attempts are retried"""
+        token = self.get_token(self.user_username, "user123")
+        gateway = payment_outbox.gateway
+
+        response = self.post_booking(token, "09:00")
+        self.assertEqual(response.status_code, 201)
+        booking = json.loads(response.data)['booking']
+        self.assertEqual(booking['payment']['status'], 'initializing')
+
+        payment = json.loads(self.client.get(f"/bookings/{booking['id']}/payment",
+            headers={"Authorization": f"Bearer {token}"}).data)['payment']
+        self.assertEqual(payment['status'], 'done')
+        self.assertTrue(payment['data']['success'])
+
+        gateway.fail_next(1)
+        booking_id = json.loads(self.post_booking(token, "11:00").data)['booking']['id']
+        entry = PaymentOutbox.query.join(Payment).filter(Payment.booking_id == booking_id).one()
+        self.assertEqual((entry.status, entry.attempts), ('pending', 1))
+        self.assertEqual(payment_outbox.drain(), 1)
+        db.session.expire_all()
+        self.assertEqual((entry.status, entry.attempts), ('done', 2))
+        self.assertEqual(entry.payment.payment_status, 'done')
+
+        gateway.fail_next(payment_outbox.max_attempts)
+        booking_id = json.loads(self.post_booking(token, "13:00").data)['booking']['id']
+        while payment_outbox.drain():
+            pass
+        db.session.expire_all()
+        payment = Payment.query.filter_by(booking_id=booking_id).one()
+        self.assertEqual(payment.payment_status, 'failed')
+        self.assertEqual(payment.booking.status, 'cancelled')
+        # The bay is free again and the rollup moved the booking
+        self.assertEqual(self.post_booking(token, "13:00").status_code, 201)
+        stats = {row.status: row.count for row in DailyBookingStat.query.filter_by(date=date.today())}
+        self.assertEqual(stats.get('cancelled'), 1)
+
+        # Committed bookings survive an outbox error in inline mode
+        with mock.patch.object(payment_outbox, 'process', side_effect=RuntimeError("database went away")):
+            self.assertEqual(self.post_booking(token, "15:00").status_code, 201)
+
+    def test_payment_response_compressed_and_deferred(self):
+        """Test gateway payloads are stored compressed, loaded on demand and migrated"""
+        bookings = self.create_bookings(2)
+        self.add_payments(bookings)
+        payload = {"id": "pi_1", "status": "succeeded", "charges": ["x" * 100] * 20}
+        bookings[0].payment.payment_response = payload
+        db.session.commit()
+        db.session.expire_all()
+
+        payment = Payment.query.filter_by(booking_id=bookings[0].id).one()
+        self.assertNotIn('payment_response', payment.__dict__)
+        self.assertEqual(payment.payment_response, payload)
+        stored = db.session.execute(text("SELECT payment_response FROM payment WHERE id = :id"),
+                                    {"id": payment.id}).scalar()
+        self.assertLess(len(stored), len(json.dumps(payload)) / 4)
+
+        # Rows written as JSON text before the change
+        legacy = bookings[1].payment.id
+        db.session.execute(text("UPDATE payment SET payment_response = :raw WHERE id = :id"),
+                           {"raw": json.dumps({"legacy": True}), "id": legacy})
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Payment, legacy).payment_response, {"legacy": True})
+        self.assertEqual(compressed_json.migrate(batch_size=1), (1, []))
+        self.assertEqual(db.session.execute(text("SELECT typeof(payment_response) FROM payment WHERE id = :id"),
+                                            {"id": legacy}).scalar(), 'blob')
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Payment, legacy).payment_response, {"legacy": True})
+        self.assertEqual(compressed_json.migrate(), (0, []))
+
+    def test_gateway_circuit_breaker(self):
+        """Test a failing gateway trips its breaker and calls then fail fast"""
+        client = gateway_clients.get('razorpay')
+        base_url, client.base_url = client.base_url, 'http://127.0.0.1:9/razorpay'
+        try:
+            for _ in range(client.breaker.failure_threshold):
+                self.assertFalse(initialize_payment('razorpay', 10.0)['success'])
+            self.assertEqual(client.breaker.state, 'open')
+            result = initialize_payment('razorpay', 10.0)
+            self.assertIn('unavailable', result['error'])
+            self.assertTrue(initialize_payment('stripe', 10.0)['success'])
+        finally:
+            client.base_url = base_url
+            client.breaker.record_success()
+
+    def test_gateway_sdk_call_deadline(self):
+        """Test an SDK call that hangs is cut off at the gateway timeout"""
+        client = gateway_clients.get('paypal')
+        timeout, client.timeout = client.timeout, 0.1
+        def hang(amount):
+            clock.sleep(1)
+            return {'success': True}
+        try:
+            with mock.patch.dict('app.helper.payment_helper.PAYMENT_METHODS', {'paypal': hang}):
+                started = clock.monotonic()
+                result = initialize_payment('paypal', 10.0)
+            self.assertLess(clock.monotonic() - started, 0.5)
+            self.assertFalse(result['success'])
+            self.assertIn('did not answer', result['error'])
+            self.assertEqual(client.breaker._failures, 1)
+        finally:
+            client.timeout = timeout
+            client.breaker.record_success()
+
+    def test_razorpay_orders_use_pooled_client(self):
+        """Test razorpay orders go through the shared SDK client with timeouts"""
+        order = {'id': 'order_1', 'currency': 'INR', 'status': 'created'}
+        with mock.patch.object(gateway_clients.razorpay, 'auth', ('key', 'secret')), \
+                mock.patch.object(gateway_clients.razorpay.order, 'create', return_value=order) as create:
+            result = initialize_payment('razorpay', 10.5)
+        self.assertEqual(result['order_id'], 'order_1')
+        create.assert_called_once_with({'amount': 1050, 'currency': 'INR'},
+                                       timeout=gateway_clients.get('razorpay').timeouts())
+
+    def stripe_webhook(self, event_type, entity):
+        body = json.dumps({"id": f"evt_{uuid.uuid4().hex}", "type": event_type,
+                           "data": {"object": entity}}).encode()
+        timestamp = str(int(clock.time()))
+        signature = hmac.new(b'whsec_test', timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+        return body, {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"}
+
+    def test_payment_webhooks(self):
+        """Test signed webhooks update payment and booking status once"""
+        booking = self.create_bookings(1)[0]
+        self.add_payments([booking])
+        payment_id = booking.payment.id
+
+        body, headers = self.stripe_webhook('payment_intent.succeeded',
+                                            {"id": "pi_1", "metadata": {"payment_id": payment_id}})
+        response = self.client.post('/webhooks/stripe', data=body,
+            headers={**headers, "Stripe-Signature": headers["Stripe-Signature"] + "0"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/webhooks/paypal', data=body, headers=headers).status_code, 404)
+
+        response = self.client.post('/webhooks/stripe', data=body, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['events'], {"applied": 1})
+        response = self.client.post('/webhooks/stripe', data=body, headers=headers)
+        self.assertEqual(json.loads(response.data)['events'], {"duplicate": 1})
+        db.session.expire_all()
+        self.assertEqual((booking.payment.payment_status, booking.payment.transaction_id), ('completed', 'pi_1'))
+        self.assertEqual(booking.status, 'confirmed')
+
+        # Found by transaction_id alone from here on
+        body, headers = self.stripe_webhook('charge.refunded', {"id": "ch_1", "payment_intent": "pi_1"})
+        response = self.client.post('/webhooks/stripe', data=body, headers=headers)
+        self.assertEqual(json.loads(response.data)['events'], {"applied": 1})
+        db.session.expire_all()
+        self.assertEqual((booking.payment.payment_status, booking.status), ('refunded', 'cancelled'))
+        stats = {row.status: row.count for row in DailyBookingStat.query.filter_by(date=booking.date)}
+        self.assertEqual(stats.get('cancelled'), 1)
+
+    def test_webhook_batch_and_replay(self):
+        """Test a batch keeps each payment's furthest event and replays are no-ops"""
+        bookings = self.create_bookings(3)
+        self.add_payments(bookings)
+        items = [
+            {"transaction_id": "pi_a", "payment_id": bookings[0].payment.id, "status": "completed"},
+            {"transaction_id": "pi_a", "payment_id": None, "status": "completed"},
+            {"transaction_id": "pi_b", "payment_id": bookings[1].payment.id, "status": "failed"},
+            {"transaction_id": "pi_b", "payment_id": bookings[1].payment.id, "status": "completed"},
+            {"transaction_id": "pi_x", "payment_id": None, "status": "completed"},
+        ]
+        with self.count_queries() as statements:
+            results = webhook_batcher.apply(items)
+        self.assertEqual(results, ["applied", "duplicate", "duplicate", "applied", "unmatched"])
+        self.assertEqual(sum(statement.lstrip().upper().startswith('UPDATE payment'.upper())
+                             for statement in statements), 1)
+        db.session.expire_all()
+        self.assertEqual([b.status for b in bookings], ['confirmed', 'confirmed', 'pending'])
+
+        archive_dir = tempfile.mkdtemp()
+        self.app.config['WEBHOOK_ARCHIVE_DIR'] = archive_dir
+        try:
+            for transaction_id, booking in (("pi_a", bookings[0]), ("pi_c", bookings[2])):
+                body, headers = self.stripe_webhook('payment_intent.succeeded',
+                    {"id": transaction_id, "metadata": {"payment_id": booking.payment.id}})
+                self.client.post('/webhooks/stripe', data=body, headers=headers)
+        finally:
+            self.app.config['WEBHOOK_ARCHIVE_DIR'] = None
+        path = os.path.join(archive_dir, os.listdir(archive_dir)[0])
+        replayed = list(webhooks.read_archive(path))
+        self.assertEqual(len(replayed), 2)
+        self.assertEqual(webhook_batcher.apply(replayed), ["duplicate", "duplicate"])
+
+    def test_reconcile_settlement_report(self):
+        """Test the report is checked in chunks and statuses catch up"""
+        bookings = self.create_bookings(3)
+        self.add_payments(bookings)
+        for booking, transaction_id in zip(bookings, ("pi_1", "pi_2", "pi_3")):
+            booking.payment.transaction_id = transaction_id
+        db.session.commit()
+
+        directory = tempfile.mkdtemp()
+        path, output = os.path.join(directory, 'report.csv'), os.path.join(directory, 'out.csv')
+        with open(path, 'w') as report:
+            report.write("balance_transaction_id,payment_intent_id,reporting_category,gross,currency\n"
+                         "txn_1,pi_1,charge,99.99,usd\n"
+                         "txn_2,pi_2,charge,50.00,usd\n"
+                         "txn_3,pi_3,charge,99.99,usd\n"
+                         "txn_4,pi_3,refund,-99.99,usd\n"
+                         "txn_5,pi_9,charge,10.00,usd\n"
+                         "txn_6,pi_1,payout,-99.99,usd\n")
+        totals = reconcile.reconcile(path, 'stripe', output, chunk_size=2)
+        self.assertEqual(totals, {"rows": 5, "discrepancies": 2, "updated": 3})
+        with open(output) as report:
+            issues = sorted((row[0], row[2]) for row in list(csv.reader(report))[1:])
+        self.assertEqual(issues, [("pi_2", "amount_mismatch"), ("pi_9", "missing_payment")])
+        db.session.expire_all()
+        self.assertEqual([b.payment.payment_status for b in bookings], ['completed', 'completed', 'refunded'])
+        self.assertEqual([b.status for b in bookings], ['confirmed', 'confirmed', 'cancelled'])
+
+        # A second run finds nothing left to update
+        self.assertEqual(reconcile.reconcile(path, 'stripe', output, chunk_size=2)["updated"], 0)
+
+    def test_booking_end_time_from_service_duration(self):
+        """Test time_to is derived from the service, not the client"""
+        token = self.get_token(self.user_username, "user123")
+        response = self.post_booking(token, "10:00", time_to="10:15")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['booking']['time_to'], '11:00')
+
+    def test_booking_vehicle_conflict(self):
+        """Test the same vehicle can't hold two overlapping slots"""
+        token = self.get_token(self.user_username, "user123")
+        self.assertEqual(self.post_booking(token, "10:00").status_code, 201)
+        self.assertEqual(self.post_booking(token, "10:30").status_code, 409)
+        # Back-to-back slots don't overlap
+        self.assertEqual(self.post_booking(token, "11:00").status_code, 201)
+
+    def test_booking_bay_capacity(self):
+        """Test overlapping bookings are capped by the bay capacity"""
+        token = self.get_token(self.user_username, "user123")
+        capacity = self.app.config['BAY_CAPACITY']['car']
+        for _ in range(capacity):
+            response = self.post_booking(token, "14:00", vehicle_id=self.add_vehicle())
+            self.assertEqual(response.status_code, 201)
+
+        response = self.post_booking(token, "14:30", vehicle_id=self.add_vehicle())
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('No wash bay', json.loads(response.data)['message'])
+
+    def test_availability_follows_bookings(self):
+        """Test free slots skip full bays and reopen on cancellation"""
+        token = self.get_token(self.user_username, "user123")
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        booking_ids = []
+        for _ in range(self.app.config['BAY_CAPACITY']['car']):
+            response = self.post_booking(token, "08:00", vehicle_id=self.add_vehicle(), date=tomorrow)
+            booking_ids.append(json.loads(response.data)['booking']['id'])
+
+        url = f'/availability?service_id={self.service_id}&from={tomorrow}&days=1&limit=2'
+        response = self.client.get(url, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        slots = json.loads(response.data)['slots']
+        self.assertEqual([slot['time_from'] for slot in slots], ['09:00', '09:15'])
+        self.assertEqual(slots[0]['time_to'], '10:00')
+
+        self.client.delete(f'/bookings/{booking_ids[0]}',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        response = self.client.get(url, headers={"Authorization": f"Bearer {token}"})
+        slots = json.loads(response.data)['slots']
+        self.assertEqual(slots[0]['time_from'], '08:00')
+
+    def test_booking_idempotency_key(self):
+        """Test a retried POST replays the first booking instead of creating another"""
+        token = self.get_token(self.user_username, "user123")
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        first = self.post_booking(token, "12:00", headers=headers)
+        retry = self.post_booking(token, "12:00", headers=headers)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(json.loads(first.data), json.loads(retry.data))
+        self.assertEqual(Booking.query.count(), 1)
+        self.assertEqual(Payment.query.count(), 1)
+
+        # Reusing the key for a different request is refused
+        response = self.post_booking(token, "15:00", headers=headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_booking_invalid_payment_method_writes_nothing(self):
+        """Test a rejected payment method leaves no orphan booking"""
+        token = self.get_token(self.user_username, "user123")
+        response = self.post_booking(token, "12:00", payment_method="cash")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.query.count(), 0)
+
+    def test_export_bookings(self):
+        """Test admin export streams NDJSON and CSV rows"""
+        self.add_payments(self.create_bookings(3))
+        token = self.get_token(self.admin_username, "admin123")
+
+        response = self.client.get('/all-bookings/export?format=ndjson',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]['username'], self.user_username)
+        self.assertEqual(records[0]['payment_method'], 'stripe')
+
+        date_to = date.today().isoformat()
+        response = self.client.get(f'/all-bookings/export?format=csv&date_to={date_to}',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        lines = response.data.decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,date,'))
+        self.assertEqual(len(lines), 2)
+
+    def test_batch_status_update(self):
+        """Test staff apply many status changes with per-item results"""
+        bookings = self.create_bookings(3)
+        self.add_payments(bookings)
+        bookings[0].status = 'confirmed'
+        bookings[1].status = 'startservice'
+        db.session.commit()
+        ids = [booking.id for booking in bookings]
+        token = self.get_token(self.admin_username, "admin123")
+
+        response = self.client.post('/bookings/status:batch',
+            headers={"Authorization": f"Bearer {token}"},
+            json={"items": [
+                {"booking_id": ids[0], "status": "complete"},
+                {"booking_id": ids[1], "status": "complete"},
+                {"booking_id": ids[2], "status": "complete"},
+                {"booking_id": "missing", "status": "complete"},
+                {"booking_id": [ids[0]], "status": "complete"},
+                {"booking_id": {"id": ids[0]}, "status": "complete"}
+            ]}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([r['result'] for r in data['results']],
+                         ['updated', 'updated', 'invalid_transition', 'not_found',
+                          'invalid_item', 'invalid_item'])
+        self.assertEqual(data['updated'], 2)
+
+        db.session.expire_all()
+        statuses = {b.id: (b.status, b.payment.payment_status) for b in Booking.query.all()}
+        self.assertEqual(statuses[ids[0]], ('complete', 'completed'))
+        self.assertEqual(statuses[ids[2]], ('pending', 'done'))
+
+    def test_add_version_columns(self):
+        """Test databases created before versioning gain the columns"""
+        booking = self.create_bookings(1)[0]
+        self.add_payments([booking])
+        booking_id = booking.id
+        db.session.remove()
+        with db.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE payment DROP COLUMN version"))
+        self.assertEqual(conditional.add_version_columns(), ['payment'])
+        self.assertEqual(conditional.add_version_columns(), [])
+        self.assertEqual(Payment.query.filter_by(booking_id=booking_id).one().version, 1)
+
+    def test_booking_conditional_requests(self):
+        """Test ETag revalidation and If-Match on status changes"""
+        booking = self.create_bookings(1)[0]
+        self.add_payments([booking])
+        token = self.get_token(self.admin_username, "admin123")
+        auth = {"Authorization": f"Bearer {token}"}
+
+        response = self.client.get(f'/bookings/{booking.id}', headers=auth)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        response = self.client.get(f'/bookings/{booking.id}',
+                                   headers={**auth, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.patch(f'/bookings/{booking.id}',
+                                     headers={**auth, "If-Match": etag},
+                                     json={"status": "confirmed"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        # A second writer still holding the old ETag loses
+        response = self.client.patch(f'/bookings/{booking.id}',
+                                     headers={**auth, "If-Match": etag},
+                                     json={"status": "complete"})
+        self.assertEqual(response.status_code, 412)
+        db.session.expire_all()
+        self.assertEqual(Booking.query.get(booking.id).status, 'confirmed')
+
+        response = self.client.get(f'/bookings/{booking.id}/payment', headers=auth)
+        payment_etag = response.headers['ETag']
+        # A 304 never reads the stored gateway response
+        with self.count_queries() as statements:
+            response = self.client.get(f'/bookings/{booking.id}/payment',
+                                       headers={**auth, "If-None-Match": payment_etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([statement for statement in statements if 'payment_response' in statement])
+        response = self.client.put(f'/bookings/{booking.id}/payment',
+                                   headers={**auth, "If-Match": '"0"'},
+                                   json={"status": "completed"})
+        self.assertEqual(response.status_code, 412)
+        response = self.client.put(f'/bookings/{booking.id}/payment',
+                                   headers={**auth, "If-Match": payment_etag},
+                                   json={"status": "completed"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_daily_report_rollup(self):
+        """Test the rollup follows booking writes and matches a backfill"""
+        token = self.get_token(self.user_username, "user123")
+        admin_token = self.get_token(self.admin_username, "admin123")
+        first = json.loads(self.post_booking(token, "09:00").data)['booking']['id']
+        self.post_booking(token, "11:00")
+        self.client.delete(f'/bookings/{first}',
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        response = self.client.get('/reports/daily?group_by=status',
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = {entry['status']: entry for entry in json.loads(response.data)['report']}
+        self.assertEqual(report['pending']['count'], 1)
+        self.assertEqual(report['cancelled']['count'], 1)
+        self.assertAlmostEqual(report['pending']['revenue'], 99.99)
+
+        def snapshot():
+            return sorted(
+                (s.date, s.service_id, s.status, s.count, round(s.revenue, 2), s.total_duration)
+                for s in DailyBookingStat.query.all() if s.count
+            )
+        incremental = snapshot()
+        rollup.backfill()
+        self.assertEqual(snapshot(), incremental)
+
+        response = self.client.get('/reports/daily?group_by=service&status=pending',
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        entry = json.loads(response.data)['report'][0]
+        self.assertEqual(entry['service']['name'], "Test Service")
+        self.assertEqual(entry['total_duration'], 60)
+
+    def read_stream(self, token, last_event_id, count):
+        """Read the first ``count`` chunks of the booking event stream"""
+        response = self.client.get('/bookings/stream',
+            headers={"Authorization": f"Bearer {token}", "Last-Event-ID": last_event_id},
+            buffered=False
+        )
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+        try:
+            return [next(chunks).decode() for _ in range(count)]
+        finally:
+            response.close()
+
+    def test_booking_stream_replays_from_last_event_id(self):
+        """Test a reconnecting dashboard receives the events it missed"""
+        last_event_id = events.event_id(events.position(None)[0])
+        token = self.get_token(self.user_username, "user123")
+        booking_id = json.loads(self.post_booking(token, "10:00").data)['booking']['id']
+        admin_token = self.get_token(self.admin_username, "admin123")
+        self.client.patch(f'/bookings/{booking_id}',
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"status": "confirmed"}
+        )
+
+        chunks = self.read_stream(admin_token, last_event_id, 4)
+        self.assertIn('event: booking.created', chunks[1])
+        self.assertIn(booking_id, chunks[1])
+        self.assertIn('event: payment.initialized', chunks[2])
+        self.assertIn('event: booking.status_changed', chunks[3])
+        self.assertIn('"new_status": "confirmed"', chunks[3])
+
+        # An id from another process can't be resumed
+        chunks = self.read_stream(admin_token, 'unknown-1', 2)
+        self.assertIn('event: resync', chunks[1])
+
+class ConcurrentBookingTestCase(unittest.TestCase):
+    """Slot checks against a SQLite file, where requests really overlap"""
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + cls.path
+            BAY_CAPACITY = {'car': 1}
+
+        cls.app = create_app(FileConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        os.remove(cls.path)
+
+    def test_concurrent_bookings_cannot_share_a_bay(self):
+        """Test two simultaneous bookings for the last bay: one wins, one gets 409"""
+        with self.app.app_context():
+            user = User(username="racer", password=password_hash("user123"),
+                        phonenumber="1122334455", role="user")
+            service = Service(service_name="Wash", description="Wash", price=10,
+                              duration=60, vehicle_type="car")
+            db.session.add_all([user, service])
+            db.session.flush()
+            vehicles = [Vehicle(vehicle_name="Car", vehicle_model="X", numberplate=f"RACE{i}",
+                                vehicle_type="car", user_id=user.id) for i in range(2)]
+            db.session.add_all(vehicles)
+            db.session.commit()
+            service_id, vehicle_ids = service.id, [vehicle.id for vehicle in vehicles]
+
+        token = self.app.test_client().post('/login',
+            json={"username": "racer", "password": "user123"}).json['accessToken']
+
+        check = slot_helper.overlapping_bookings
+        def slow_check(*args, **kwargs):
+            rows = check(*args, **kwargs)
+            # Widen the gap between the overlap check and the insert
+            clock.sleep(0.3)
+            return rows
+
+        statuses = []
+        def post(vehicle_id):
+            response = self.app.test_client().post('/bookings',
+                headers={"Authorization": f"Bearer {token}"},
+                json={"service_id": service_id, "vehicle_id": vehicle_id,
+                      "date": date.today().isoformat(), "time_from": "10:00",
+                      "payment_method": "stripe"})
+            statuses.append(response.status_code)
+
+        with mock.patch.object(slot_helper, 'overlapping_bookings', side_effect=slow_check):
+            threads = [threading.Thread(target=post, args=(vehicle_id,)) for vehicle_id in vehicle_ids]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(statuses), [201, 409])
+        with self.app.app_context():
+            self.assertEqual(Booking.query.count(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
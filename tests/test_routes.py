@@ -119,6 +119,35 @@ class TestRoutes(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('users', data)
 
+    def test_user_list_pagination_and_search(self):
+        """Test admins page through users with sparse fields and prefix search"""
+        db.session.add_all([User(
+            username=f"zed_{i}", password="x", phonenumber=f"55500{i}", role="user"
+        ) for i in range(3)])
+        db.session.commit()
+        token = self.get_token(self.admin.username, "admin123")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        names, cursor = [], None
+        while True:
+            url = '/users?limit=2&fields=username,role' + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(self.client.get(url, headers=headers).data)
+            self.assertTrue(all(set(u) == {'username', 'role'} for u in data['users']))
+            names += [u['username'] for u in data['users']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 6)
+
+        data = json.loads(self.client.get('/users?q=zed_', headers=headers).data)
+        self.assertEqual([u['username'] for u in data['users']], ['zed_0', 'zed_1', 'zed_2'])
+        data = json.loads(self.client.get('/users?q=555001', headers=headers).data)
+        self.assertEqual([u['username'] for u in data['users']], ['zed_1'])
+
+        response = self.client.get('/users?fields=password', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
     # Service Tests
     def test_create_service(self):
         """Test creating service (admin only)"""
@@ -152,6 +181,70 @@ class TestRoutes(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 201)
 
+    def test_vehicle_lists_scoped_and_paginated(self):
+        """Test /vehicles only lists the caller's and /all-vehicles pages with filters"""
+        db.session.add_all([
+            Vehicle(vehicle_name="Admin Bike", vehicle_model="X", numberplate="ADM001",
+                    vehicle_type="bike", user_id=self.admin.id),
+            Vehicle(vehicle_name="First Car", vehicle_model="X", numberplate="TEST001",
+                    vehicle_type="car", user_id=self.user.id),
+            Vehicle(vehicle_name="Second Car", vehicle_model="X", numberplate="TEST002",
+                    vehicle_type="car", user_id=self.user.id),
+        ])
+        db.session.commit()
+        user_token = self.get_token(self.user.username, "user123")
+        admin_token = self.get_token(self.admin.username, "admin123")
+
+        data = json.loads(self.client.get('/vehicles',
+            headers={"Authorization": f"Bearer {user_token}"}).data)
+        self.assertEqual(data['total'], 2)
+        self.assertTrue(all(v['user_id'] == self.user.id for v in data['users']))
+
+        response = self.client.get('/all-vehicles', headers={"Authorization": f"Bearer {user_token}"})
+        self.assertEqual(response.status_code, 403)
+
+        seen, cursor = [], None
+        while True:
+            url = '/all-vehicles?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(self.client.get(url,
+                headers={"Authorization": f"Bearer {admin_token}"}).data)
+            seen += [v['id'] for v in data['vehicles']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(seen, sorted(seen))
+
+        for query, expected in [('vehicle_type=bike', 1), (f'user_id={self.user.id}', 2),
+                                ('numberplate=ADM', 1), ('numberplate=TEST', 2)]:
+            data = json.loads(self.client.get(f'/all-vehicles?{query}',
+                headers={"Authorization": f"Bearer {admin_token}"}).data)
+            self.assertEqual(data['total'], expected, query)
+
+    def test_numberplates_normalised(self):
+        """Test plates differing only in case or spacing collide and resolve by plate"""
+        user_token = self.get_token(self.user.username, "user123")
+        staff_token = self.get_token(self.staff.username, "staff123")
+        vehicle = {"vehicle_name": "Swift", "vehicle_model": "VXI", "vehicle_type": "car"}
+
+        response = self.client.post('/vehicles', headers={"Authorization": f"Bearer {user_token}"},
+                                    json={**vehicle, "numberplate": "KA 01 AB 1234"})
+        self.assertEqual(response.status_code, 201)
+        vehicle_id = json.loads(response.data)['vehicle']['id']
+
+        response = self.client.post('/vehicles', headers={"Authorization": f"Bearer {user_token}"},
+                                    json={**vehicle, "numberplate": "ka01ab-1234"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/vehicles/by-plate/ka01 ab1234',
+                                   headers={"Authorization": f"Bearer {staff_token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['vehicle']['id'], vehicle_id)
+
+        response = self.client.get('/vehicles/by-plate/KA01AB1234',
+                                   headers={"Authorization": f"Bearer {user_token}"})
+        self.assertEqual(response.status_code, 403)
+
     # Booking Tests
     def test_create_booking(self):
         """Test creating booking"""
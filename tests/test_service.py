@@ -3,6 +3,7 @@ import json
 from app import create_app, db
 from app.models import User, Service
 from app.helper.auth_helper import password_hash
+from app.helper import catalog_cache
 import uuid
 
 class ServiceTestCase(unittest.TestCase):
@@ -109,6 +110,93 @@ class ServiceTestCase(unittest.TestCase):
         self.assertIn('services', data)
         self.assertTrue(len(data['services']) > 0)
 
+    def test_service_catalog_cache(self):
+        """Test /services is served from cache, revalidates and follows edits"""
+        response = self.client.get('/services')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        response = self.client.get('/services', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        token = self.get_admin_token()
+        response = self.client.post('/services',
+            headers={"Authorization": f"Bearer {token}"},
+            json={"service_name": "Wax", "description": "Hand wax", "price": 20,
+                  "duration": 30, "vehicle_type": "car"})
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get('/services', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        names = [s['service_name'] for s in json.loads(response.data)['services']]
+        self.assertIn("Wax", names)
+
+        # The worker's copy is dropped when the write commits, not before
+        cache = self.app.extensions['catalog_cache']
+        catalog_cache.invalidate()
+        self.assertIsNotNone(cache._entry)
+        db.session.commit()
+        self.assertIsNone(cache._entry)
+
+    def test_filter_services(self):
+        """Test filtering services by vehicle type, price and duration"""
+        db.session.add_all([
+            Service(service_name="Bike Wash", description="Bike", price=15.0, duration=20, vehicle_type="bike"),
+            Service(service_name="Quick Wash", description="Car", price=25.0, duration=30, vehicle_type="car"),
+            Service(service_name="Full Detail", description="Car", price=250.0, duration=240, vehicle_type="car")
+        ])
+        db.session.commit()
+
+        response = self.client.get('/services?vehicle_type=car&max_price=100&sort=price')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['service_name'] for s in data['services']],
+                         ["Quick Wash", self.test_service_name])
+
+        response = self.client.get('/services?vehicle_type=car&min_price=50&max_duration=90')
+        data = json.loads(response.data)
+        self.assertEqual([s['service_name'] for s in data['services']], [self.test_service_name])
+
+        response = self.client.get('/services?max_price=cheap')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_services(self):
+        """Test ranked full-text search follows service writes"""
+        token = self.get_admin_token()
+        db.session.add_all([
+            Service(service_name="Ceramic Coating", description="Long lasting paint protection",
+                    price=300.0, duration=180, vehicle_type="car"),
+            Service(service_name="Interior Clean", description="Vacuum and ceramic dashboard polish",
+                    price=40.0, duration=45, vehicle_type="car")
+        ])
+        db.session.commit()
+
+        response = self.client.get('/services/search?q=ceramic')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['service_name'] for s in data['services']],
+                         ["Ceramic Coating", "Interior Clean"])
+
+        response = self.client.get('/services/search?q=ceramic coat')
+        data = json.loads(response.data)
+        self.assertEqual([s['service_name'] for s in data['services']], ["Ceramic Coating"])
+
+        self.client.put(f'/services/{self.service_id}',
+            headers={"Authorization": f"Bearer {token}"},
+            json={"service_name": "Underbody Rinse"})
+        response = self.client.get('/services/search?q=underbody')
+        data = json.loads(response.data)
+        self.assertEqual([s['id'] for s in data['services']], [self.service_id])
+
+        self.client.delete(f'/services/{self.service_id}',
+            headers={"Authorization": f"Bearer {token}"})
+        response = self.client.get('/services/search?q=underbody')
+        self.assertEqual(json.loads(response.data)['total'], 0)
+
+        response = self.client.get('/services/search?q=')
+        self.assertEqual(response.status_code, 400)
+
     def test_get_service_detail(self):
         """Test getting single service detail"""
         response = self.client.get(f'/services/{self.service_id}')